@@ -57,8 +57,74 @@ if __name__ == "__main__":
     http_get_parser.add_argument('-t', '--timeout', 
                                  type=int,
                                  default=5, help='请求超时时间(秒) (默认: 5)')
-    http_get_parser.add_argument('-w', '--workers', 
+    http_get_parser.add_argument('-w', '--workers', '--max-workers',
+                                 dest='workers',
                                  type=int, default=10, help='最大并发数 (默认: 10)')
+    http_get_parser.add_argument('--min-workers',
+                                 type=int, default=1, help='最小并发数，实际并发数在上下限之间自适应调整 (默认: 1)')
+    http_get_parser.add_argument('--engine',
+                                 choices=['async', 'thread'], default='async',
+                                 help='扫描引擎: async 按(域名,端口)调度, thread 按域名使用线程池 (默认: async)')
+    http_get_parser.add_argument('--pool-size',
+                                 type=int, default=0, help='单个主机保留的最大keep-alive连接数, 0表示与并发数一致 (默认: 0)')
+    http_get_parser.add_argument('--preprobe',
+                                 action='store_true', help='HTTP请求前先做TCP connect端口预探测，只请求开放的端口')
+    http_get_parser.add_argument('--connect-timeout',
+                                 type=float, default=1.0, help='端口预探测连接超时时间(秒) (默认: 1.0)')
+    http_get_parser.add_argument('--probe-concurrency',
+                                 type=int, default=500, help='端口预探测并发连接数 (默认: 500)')
+    http_get_parser.add_argument('--resolve',
+                                 action='store_true', help='探测前批量解析域名，丢弃无法解析的域名并按IP去重端口预探测')
+    http_get_parser.add_argument('--dns-concurrency',
+                                 type=int, default=200, help='DNS解析并发数 (默认: 200)')
+    http_get_parser.add_argument('--journal',
+                                 help='检查点日志文件 (默认: <输入文件>.journal)')
+    http_get_parser.add_argument('--resume',
+                                 action='store_true', help='从检查点日志继续上次中断的扫描，并合并之前的结果')
+    http_get_parser.add_argument('--batch-size',
+                                 type=int, default=10000, help='启用DNS解析/端口预探测/敏感路径探测时每批处理的域名数 (默认: 10000)')
+    http_get_parser.add_argument('--results-format',
+                                 choices=['jsonl', 'csv'], default='jsonl',
+                                 help='实时结果文件格式，文件名与输出文件相同 (默认: jsonl)')
+    http_get_parser.add_argument('--per-host-rate',
+                                 type=float, default=0, help='单个主机/IP每秒最多请求数, 0表示不限制 (默认: 0)')
+    http_get_parser.add_argument('--per-host-concurrency',
+                                 type=int, default=0, help='单个主机/IP同时在途的最大请求数, 0表示不限制 (默认: 0)')
+    http_get_parser.add_argument('--cluster-threshold',
+                                 type=int, default=3, help='相同响应指纹出现超过该次数后折叠显示 (默认: 3)')
+    http_get_parser.add_argument('--follow-redirects',
+                                 type=int, default=0, metavar='N',
+                                 help='3xx响应最多继续跟随N跳并记录完整跳转链和最终落地页, 0表示只记录第一跳 (默认: 0)')
+    http_get_parser.add_argument('-p', '--ports',
+                                 type=HttpScanner.parse_ports, default=None,
+                                 help='探测端口列表, 支持范围和协议后缀, 如 80,443,8000-8100,8081:https (默认: 常见HTTP/HTTPS端口)')
+    http_get_parser.add_argument('--detect-protocol',
+                                 action='store_true', help='端口预探测时识别每个端口实际是HTTP还是TLS, 结果按(IP, 端口)缓存 (隐含 --preprobe)')
+    http_get_parser.add_argument('--processes',
+                                 type=int, default=1, help='扫描进程数, 大于1时输入按域名哈希分片到多个进程, 并发数等参数对每个进程生效 (默认: 1)')
+    http_get_parser.add_argument('--metrics-file',
+                                 default=None, help='扫描结束时以Prometheus文本格式写出分阶段延迟统计的文件')
+    http_get_parser.add_argument('--probe-deadline',
+                                 type=float, default=None, help='单个探测的总耗时上限(秒), 0表示不限制 (默认: 超时时间的3倍)')
+    http_get_parser.add_argument('--host-deadline',
+                                 type=float, default=0, help='单个主机所有探测的累计耗时上限(秒), 用完后跳过其余端口, 0表示不限制 (默认: 0)')
+    http_get_parser.add_argument('--min-rate',
+                                 type=float, default=0, help='读取响应正文的最低速率(字节/秒), 低于该速率的慢速响应被中止, 0表示不检查 (默认: 0)')
+    http_get_parser.add_argument('--vhost',
+                                 action='store_true', help='虚拟主机模式: 域名按解析到的IP分组, 通过Host请求头和SNI复用到该IP的连接, 并与默认站点的基线响应比较 (隐含 --resolve)')
+    http_get_parser.add_argument('--paths',
+                                 default=None, metavar='WORDLIST',
+                                 help='敏感路径字典文件, 指定时对每个存活源站先请求随机路径作为基线, 再探测字典中的路径并丢弃与基线相同的响应')
+    http_get_parser.add_argument('--tech',
+                                 action='store_true', help='根据特征库识别每个响应使用的技术栈 (Web服务器、框架、CMS、中间件等)')
+    http_get_parser.add_argument('--tech-signatures',
+                                 nargs='+', default=None, metavar='FILE',
+                                 help='技术栈特征文件(JSON), 可指定多个, 替代内置特征库 (隐含 --tech)')
+    http_get_parser.add_argument('--body-store',
+                                 default=None, metavar='DIR',
+                                 help='响应正文存储目录, 命中结果的正文按内容哈希gzip压缩去重保存, index.jsonl记录URL到哈希的映射')
+    http_get_parser.add_argument('--body-store-limit',
+                                 type=int, default=512 * 1024, help='单个响应正文保存的最大字节数 (默认: 524288)')
     
     #xss_pdf 命令 (示例占位符)
     xss_pdf_parser = subparsers.add_parser('xss_pdf', help='生成含XSS的PDF文件')
@@ -116,12 +182,45 @@ if __name__ == "__main__":
         )
     elif args.command == 'http_get':
         print("执行HTTP GET请求工具")
-        scanner = HttpScanner()
+        scanner = HttpScanner(
+            timeout=args.timeout,
+            max_workers=args.workers,
+            min_workers=args.min_workers,
+            engine=args.engine,
+            pool_size=args.pool_size,
+            preprobe=args.preprobe,
+            connect_timeout=args.connect_timeout,
+            probe_concurrency=args.probe_concurrency,
+            resolve_dns=args.resolve,
+            dns_concurrency=args.dns_concurrency,
+            journal_file=args.journal,
+            resume=args.resume,
+            batch_size=args.batch_size,
+            results_format=args.results_format,
+            host_rate=args.per_host_rate,
+            host_concurrency=args.per_host_concurrency,
+            cluster_threshold=args.cluster_threshold,
+            max_redirects=args.follow_redirects,
+            ports=args.ports,
+            detect_protocol=args.detect_protocol,
+            processes=args.processes,
+            metrics_file=args.metrics_file,
+            probe_deadline=args.probe_deadline,
+            host_deadline=args.host_deadline,
+            min_transfer_rate=args.min_rate,
+            vhost=args.vhost,
+            path_wordlist=args.paths,
+            tech=args.tech,
+            tech_signatures=args.tech_signatures,
+            body_store=args.body_store,
+            body_store_limit=args.body_store_limit
+        )
         scanner.run(
             input_file=args.input_file,
             output_file=args.output,
             timeout=args.timeout,
-            max_workers=args.workers
+            max_workers=args.workers,
+            min_workers=args.min_workers
         )
     elif args.command == 'xss_pdf':
         print("执行XSS PDF生成工具")
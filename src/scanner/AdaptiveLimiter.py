@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+AIMD自适应并发控制器
+按窗口统计探测结果：延迟和错误率正常时增加并发（启动阶段倍增，之后线性增加），
+超时、连接重置或429/503比例升高、延迟明显变大时按比例降低并发
+"""
+
+import threading
+from typing import Dict
+
+
+class AdaptiveLimiter:
+    # 计入拥塞信号的结果类型
+    CONGESTION_OUTCOMES = ('timeout', 'reset', 'throttled')
+
+    def __init__(self, min_limit: int = 1, max_limit: int = 10, initial_limit: int = 0,
+                 error_threshold: float = 0.1, latency_factor: float = 3.0,
+                 backoff: float = 0.5, increase_step: int = 1):
+        """
+        初始化并发控制器
+
+        Args:
+            min_limit: 最小并发数
+            max_limit: 最大并发数
+            initial_limit: 初始并发数，0表示 min(max_limit, max(min_limit, 10))
+            error_threshold: 窗口内拥塞信号比例超过该值时降低并发
+            latency_factor: 窗口平均延迟超过基准延迟的倍数时降低并发
+            backoff: 降低并发时的乘数
+            increase_step: 退出启动阶段后每个窗口增加的并发数
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        if initial_limit <= 0:
+            initial_limit = min(self.max_limit, max(self.min_limit, 10))
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self.backoff = backoff
+        self.increase_step = increase_step
+
+        self.in_flight = 0
+        self.slow_start = True
+        self.baseline_latency = 0.0
+        self.peak_limit = int(self.limit)
+        self.adjustments = {'increase': 0, 'decrease': 0}
+        self._reset_window()
+        self._cond = threading.Condition()
+
+    def _reset_window(self):
+        self.window_count = 0
+        self.window_congestion = 0
+        self.window_latency = 0.0
+        self.window_latency_count = 0
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def try_acquire(self) -> bool:
+        """
+        尝试占用一个并发槽位（不阻塞）
+        """
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """
+        占用一个并发槽位，超出当前并发上限时阻塞等待
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait(timeout=1)
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def record(self, latency: float, outcome: str = 'ok'):
+        """
+        记录一次探测结果
+
+        Args:
+            latency: 从发出请求到收到响应头（或失败）的耗时（秒）
+            outcome: 'ok'、'timeout'、'reset'、'throttled' 或 'other'（如连接被拒绝，不计入拥塞）
+        """
+        with self._cond:
+            self.window_count += 1
+            if outcome in self.CONGESTION_OUTCOMES:
+                self.window_congestion += 1
+            elif outcome == 'ok':
+                self.window_latency += latency
+                self.window_latency_count += 1
+
+            # 窗口大小与当前并发数一致，约等于每轮往返调整一次
+            if self.window_count >= max(int(self.limit), 10):
+                self._adjust()
+
+    def _adjust(self):
+        congestion_rate = self.window_congestion / self.window_count
+        avg_latency = self.window_latency / self.window_latency_count if self.window_latency_count else 0.0
+        if avg_latency:
+            if not self.baseline_latency or avg_latency < self.baseline_latency:
+                self.baseline_latency = avg_latency
+            else:
+                # 基准延迟缓慢跟随，网络整体变慢时不至于一直判定为延迟突增
+                self.baseline_latency += (avg_latency - self.baseline_latency) * 0.05
+
+        latency_spike = (self.baseline_latency and avg_latency > self.baseline_latency * self.latency_factor)
+        if congestion_rate > self.error_threshold or latency_spike:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self.slow_start = False
+            self.adjustments['decrease'] += 1
+        elif self.limit < self.max_limit:
+            step = self.limit if self.slow_start else self.increase_step
+            self.limit = min(self.max_limit, self.limit + step)
+            self.adjustments['increase'] += 1
+            self._cond.notify_all()
+
+        self.peak_limit = max(self.peak_limit, int(self.limit))
+        self._reset_window()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'peak': self.peak_limit,
+                'increase': self.adjustments['increase'],
+                'decrease': self.adjustments['decrease'],
+                'baseline_latency': self.baseline_latency,
+            }
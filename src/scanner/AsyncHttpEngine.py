@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+基于asyncio/aiohttp的HTTP扫描引擎
+每个(域名, 端口)组合作为独立任务调度，受全局并发数限制，
+单个慢速主机只会占用一个并发槽位，而不是拖住整个域名的所有端口
+"""
+
+import asyncio
+import socket
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import aiohttp
+import yarl
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from scanner.ResponseAnalysis import ResponseAnalysis
+from scanner.ProbeDeadline import ProbeAborted
+from scanner.PathProbe import PathProbe
+
+
+class CachedResolver(AbstractResolver):
+    """
+    优先使用DNS解析阶段的结果，避免HTTP请求时重复解析
+    """
+    def __init__(self, domain_ips: Dict[str, List[str]]):
+        self.domain_ips = domain_ips
+        self.fallback = DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET):
+        ips = self.domain_ips.get(host)
+        if not ips:
+            return await self.fallback.resolve(host, port, family)
+        return [{'hostname': host, 'host': ip, 'port': port, 'family': socket.AF_INET,
+                 'proto': 0, 'flags': socket.AI_NUMERICHOST} for ip in ips]
+
+    async def close(self):
+        await self.fallback.close()
+
+
+class AsyncHttpEngine:
+    def __init__(self, scanner, pool_size: int = 0):
+        """
+        初始化异步扫描引擎
+        全局并发数由scanner的自适应并发控制器决定
+
+        Args:
+            scanner: HttpScanner实例，提供端口列表、请求头、标题提取、并发控制等配置
+            pool_size: 单个主机的最大连接数，0表示不单独限制
+        """
+        self.scanner = scanner
+        self.limiter = scanner.limiter
+        self.pool_size = pool_size
+        self.pool_hits = 0
+        self.pool_misses = 0
+
+    def pool_stats(self) -> Dict[str, int]:
+        """
+        返回连接池统计信息
+
+        Returns:
+            {'requests': 请求数, 'hits': 复用连接次数, 'misses': 新建连接次数}
+        """
+        return {
+            'requests': self.pool_hits + self.pool_misses,
+            'hits': self.pool_hits,
+            'misses': self.pool_misses,
+        }
+
+    def create_trace_config(self) -> aiohttp.TraceConfig:
+        """
+        创建用于统计连接复用情况和建连、首字节耗时的TraceConfig
+        aiohttp没有单独的TLS握手事件，TCP连接耗时中包含TLS握手；
+        建连失败时没有create_end事件，由请求异常事件记录失败前花费的时间
+        """
+        latency = self.scanner.latency
+
+        async def on_request_start(session, context, params):
+            context.host = params.url.host
+            context.dns_time = 0.0
+
+        async def on_dns_resolvehost_start(session, context, params):
+            context.dns_start = time.monotonic()
+
+        async def on_dns_resolvehost_end(session, context, params):
+            context.dns_time = time.monotonic() - context.dns_start
+            context.dns_done = True
+            latency.observe('dns', context.dns_time, context.host)
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_start = time.monotonic()
+
+        async def on_connection_reuseconn(session, context, params):
+            self.pool_hits += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.pool_misses += 1
+            context.connected = True
+            # 建连过程中包含DNS解析，扣除后为TCP连接（及TLS握手）耗时
+            connect_time = time.monotonic() - context.connect_start - context.dns_time
+            latency.observe('connect', connect_time, context.host)
+
+        async def on_request_headers_sent(session, context, params):
+            context.sent = time.monotonic()
+
+        async def on_request_end(session, context, params):
+            if hasattr(context, 'sent'):
+                latency.observe('ttfb', time.monotonic() - context.sent, context.host)
+
+        async def on_request_exception(session, context, params):
+            # 解析失败、连接超时/被拒、握手失败（以及截止时间取消）时记录建连已花费的时间
+            if not hasattr(context, 'connect_start') or hasattr(context, 'connected'):
+                return
+            if hasattr(context, 'dns_start') and not hasattr(context, 'dns_done'):
+                latency.observe('dns', time.monotonic() - context.dns_start, context.host)
+            else:
+                latency.observe('connect', time.monotonic() - context.connect_start - context.dns_time, context.host)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_request_headers_sent.append(on_request_headers_sent)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    def iter_work_units(self, domains: Iterable[str]) -> Iterator[Tuple[str, int, str]]:
+        """
+        将域名展开为扁平的(域名, 端口, 协议)工作单元，并按主机交错排列
+        """
+        def expand():
+            for domain in domains:
+                domain = self.scanner.normalize_domain(domain)
+                if not domain:
+                    continue
+                for port, protocol in self.scanner.get_ports(domain):
+                    yield domain, port, protocol
+
+        return self.scanner.scheduler.interleave(expand(), lambda unit: self.scanner.get_host_key(unit[0]))
+
+    async def test_url(self, session: aiohttp.ClientSession, url: str,
+                       guard=None) -> Tuple[bool, int, str, str, str, str, Dict]:
+        """
+        测试单个URL并提取标题和跳转信息
+
+        Returns:
+            (是否成功, 状态码, URL, 标题, 跳转URL, 错误信息, 附加字段)
+        """
+        scanner = self.scanner
+        if scanner.exit_handler.exit_now:
+            return False, 0, url, "", "", "扫描已终止", {}
+
+        # 虚拟主机模式下按IP请求，Host请求头和SNI使用域名
+        request_url, host_header = scanner.route_request(url)
+        options = {}
+        if host_header:
+            options['headers'] = {'Host': host_header}
+            if url.startswith('https://'):
+                options['server_hostname'] = host_header.partition(':')[0]
+
+        host = yarl.URL(request_url).host
+        headers_time = None
+        start_time = time.monotonic()
+        try:
+            async with session.get(request_url, allow_redirects=False, **options) as response:
+                scanner.record_outcome(start_time, response.status)
+                headers_time = time.monotonic()
+                try:
+                    if response.status not in scanner.target_status_codes:
+                        return False, response.status, url, "", "", "", {}
+
+                    redirect_url = scanner.get_redirect_url(url, response.status, response.headers)
+
+                    # 读取正文前缀计算响应指纹，200响应同时边读边找标题
+                    analysis = ResponseAnalysis(scanner, url, response.status, response.headers)
+                    if guard is not None:
+                        guard.begin_body()
+                    async for chunk in response.content.iter_chunked(8192):
+                        if analysis.feed(chunk) or (guard is not None and guard.feed(len(chunk))):
+                            break
+                    title, extra = analysis.finish()
+                    if guard is not None and guard.reason:
+                        extra['aborted'] = guard.describe()
+                    scanner.latency.observe('body', time.monotonic() - headers_time, host)
+                finally:
+                    scanner.latency.observe('total', time.monotonic() - start_time, host)
+
+            # 释放连接后再沿跳转链继续请求
+            if redirect_url and scanner.redirects.enabled:
+                extra.update(await self.follow_redirects(session, url, redirect_url))
+            return True, response.status, url, title, redirect_url, "", extra
+
+        except asyncio.TimeoutError as e:
+            scanner.record_outcome(start_time, exc=e)
+            return False, 0, url, "", "", "超时", {}
+        except aiohttp.ClientConnectionError as e:
+            scanner.record_outcome(start_time, exc=e)
+            return False, 0, url, "", "", "连接失败", {}
+        except Exception as e:
+            scanner.record_outcome(start_time, exc=e)
+            return False, 0, url, "", "", "请求失败", {}
+        finally:
+            if headers_time is None:
+                # 收到响应头之前失败（超时、连接被拒、握手失败、截止时间取消）的请求也计入总耗时
+                scanner.latency.observe('total', time.monotonic() - start_time, host)
+
+    async def fetch_redirect_hop(self, session: aiohttp.ClientSession, url: str) -> Tuple[int, str, str]:
+        """
+        请求跳转链中的一跳
+
+        Returns:
+            (状态码, 跳转URL, 标题)，请求失败时状态码为0
+        """
+        scanner = self.scanner
+        try:
+            async with session.get(url, allow_redirects=False) as response:
+                location = scanner.get_redirect_url(url, response.status, response.headers)
+                title = ""
+                if response.status == 200:
+                    sniffer = scanner.create_title_sniffer(response.headers)
+                    if sniffer.is_html:
+                        async for chunk in response.content.iter_chunked(8192):
+                            if sniffer.feed(chunk):
+                                break
+                    title = sniffer.get_title()
+                return response.status, location, title
+        except Exception:
+            return 0, "", ""
+
+    async def follow_redirects(self, session: aiohttp.ClientSession, url: str, location: str) -> Dict:
+        """
+        沿跳转链请求到最终落地页，已缓存的跳转不再发请求
+        """
+        redirects = self.scanner.redirects
+        chain = redirects.start(url, location)
+        while chain.next_url and not self.scanner.exit_handler.exit_now:
+            hop_url = chain.next_url
+            if not redirects.claim(hop_url):
+                # 同一跳已缓存或正由其他探测请求，等其结果
+                await redirects.wait_async(hop_url, self.scanner.timeout)
+                if chain.advance():
+                    continue
+            chain.step(hop_url, *(await self.fetch_redirect_hop(session, hop_url)))
+        return chain.finish()
+
+    async def fetch_vhost_baseline(self, session: aiohttp.ClientSession, key: Tuple[str, int, str]) -> Dict:
+        """
+        获取(IP, 端口, 协议)默认站点的基线响应，同一基线只请求一次
+        """
+        vhosts = self.scanner.vhosts
+        while True:
+            baseline = vhosts.lookup(key)
+            if baseline is not None:
+                return baseline
+            if vhosts.claim(key):
+                break
+            await vhosts.wait_async(key, self.scanner.timeout)
+        # 与其他探测一样经过截止时间保护和单主机速率限制
+        url = self.scanner.vhost_baseline_url(key)
+        return vhosts.store(key, await self.request(session, key[0], url, extra=True))
+
+    async def test_url_guarded(self, session: aiohttp.ClientSession, url: str, host_key: str,
+                               guard) -> Tuple[bool, int, str, str, str, str, Dict]:
+        """
+        在截止时间内测试URL，到期时取消请求
+        """
+        scanner = self.scanner
+        guard.arm()
+        try:
+            return await asyncio.wait_for(self.test_url(session, url, guard), guard.limit or None)
+        except asyncio.TimeoutError:
+            # test_url内部的超时已被处理，这里只会是截止时间到达
+            guard.expire()
+            scanner.record_outcome(guard.started, exc=ProbeAborted(guard.reason))
+            return False, 0, url, "", "", guard.describe(), {}
+        finally:
+            scanner.deadlines.end(host_key, guard)
+
+    async def request(self, session: aiohttp.ClientSession, domain: str, url: str,
+                      extra: bool = False) -> Tuple[bool, int, str, str, str, str, Dict]:
+        """
+        在截止时间保护下测试URL，单主机限制已在run_units分发单元时满足；
+        extra为True表示单元中的额外请求，需要另外按单主机速率间隔发送
+        """
+        scanner = self.scanner
+        host_key = scanner.get_host_key(domain)
+        if extra:
+            await scanner.scheduler.pace_async(host_key)
+
+        guard = None
+        if scanner.deadlines.enabled:
+            guard = scanner.deadlines.begin(host_key)
+            if guard is None:
+                return False, 0, url, "", "", "主机耗时超出预算", {}
+
+        if guard is None:
+            return await self.test_url(session, url)
+        return await self.test_url_guarded(session, url, host_key, guard)
+
+    async def probe(self, session: aiohttp.ClientSession, domain: str, port: int, protocol: str):
+        """
+        探测单个(域名, 端口)工作单元，命中时打印结果
+        """
+        scanner = self.scanner
+        outcome = await self.request(session, domain, scanner.build_url(domain, port, protocol))
+
+        if scanner.vhosts is not None and outcome[0]:
+            vhost_key = scanner.vhost_baseline_key(domain, port, protocol)
+            scanner.diff_vhost(vhost_key, await self.fetch_vhost_baseline(session, vhost_key), outcome)
+
+        result = scanner.complete_probe(domain, port, protocol, outcome)
+        if result and scanner.should_display(result):
+            print(scanner.format_result(result))
+
+    async def fetch_path_baseline(self, session: aiohttp.ClientSession, domain: str, port: int, protocol: str):
+        """
+        请求源站的随机路径作为敏感路径探测的基线
+        """
+        scanner = self.scanner
+        url = scanner.build_path_url(domain, port, protocol, PathProbe.random_path())
+        scanner.path_probe.store_baseline((domain, port, protocol), await self.request(session, domain, url))
+
+    async def probe_path(self, session: aiohttp.ClientSession, domain: str, port: int, protocol: str, path: str):
+        """
+        探测源站上的一个敏感路径，命中时打印结果
+        """
+        scanner = self.scanner
+        outcome = await self.request(session, domain, scanner.build_path_url(domain, port, protocol, path))
+        result = scanner.complete_path_probe(domain, port, protocol, path, outcome)
+        if result and scanner.should_display(result):
+            print(scanner.format_result(result))
+
+    def create_session(self) -> aiohttp.ClientSession:
+        scanner = self.scanner
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=scanner.timeout, sock_read=scanner.timeout)
+        resolver = CachedResolver(scanner.domain_ips) if scanner.domain_ips else None
+        connector = aiohttp.TCPConnector(limit=self.limiter.max_limit, limit_per_host=self.pool_size,
+                                         ssl=False, ttl_dns_cache=300, resolver=resolver)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=scanner.headers,
+                                     trace_configs=[self.create_trace_config()])
+
+    async def run_units(self, session: aiohttp.ClientSession, units: Iterable[Tuple], handler: Callable):
+        """
+        并发执行所有工作单元，每个单元调用handler(session, *unit)
+        """
+        scanner = self.scanner
+        scheduler = scanner.scheduler
+        slot_released = asyncio.Event()
+        pending = set()
+
+        def on_done(task: asyncio.Task, key):
+            pending.discard(task)
+            self.limiter.release()
+            if key is not None:
+                scheduler.release(key)
+            slot_released.set()
+
+        # 先由调度器放行单元所属主机（主机忙时暂存其单元，先分发其他主机的），
+        # 再占用全局并发槽位，避免受限主机的单元占满槽位拖住其他主机
+        for unit, key in scheduler.dispatch(units, lambda unit: scanner.get_host_key(unit[0])):
+            if unit is None:
+                # 暂无可放行的主机，等待有单元完成或主机到达发送时间
+                slot_released.clear()
+                try:
+                    await asyncio.wait_for(slot_released.wait(), key)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if scanner.exit_handler.exit_now:
+                if key is not None:
+                    scheduler.release(key)
+                print("\n[!] 正在终止任务提交...")
+                break
+
+            # 槽位数由自适应控制器动态调整
+            while not self.limiter.try_acquire():
+                slot_released.clear()
+                await slot_released.wait()
+            task = asyncio.create_task(handler(session, *unit))
+            pending.add(task)
+            task.add_done_callback(lambda task, key=key: on_done(task, key))
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def scan(self, domains: Iterable[str]):
+        """
+        并发扫描所有(域名, 端口)组合，命中结果由HttpScanner实时写出
+        """
+        async with self.create_session() as session:
+            await self.run_units(session, self.iter_work_units(domains), self.probe)
+
+    async def scan_paths(self, origins: List[Tuple[str, int, str]]):
+        """
+        对存活源站执行敏感路径探测：先请求每个源站的随机路径基线，再请求字典中的路径
+        两个阶段共用同一个会话，基线请求建立的连接被路径请求复用
+        """
+        scanner = self.scanner
+        key_func = lambda unit: scanner.get_host_key(unit[0])
+        async with self.create_session() as session:
+            await self.run_units(session, scanner.scheduler.interleave(origins, key_func), self.fetch_path_baseline)
+            if scanner.exit_handler.exit_now:
+                return
+            units = scanner.scheduler.interleave(scanner.path_probe.iter_units(origins), key_func)
+            await self.run_units(session, units, self.probe_path)
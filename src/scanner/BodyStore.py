@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+内容寻址的响应正文存储
+命中结果的响应正文（截断到上限）按SHA-256存为gzip压缩的对象文件，相同内容只存一份；
+索引文件逐行记录 URL -> 正文哈希，扫描结束后可以离线用 zgrep 等工具重新检索全部正文，
+无需再次请求目标。压缩和写盘在后台线程完成，不占用扫描线程和事件循环
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class BodyStore:
+    _STOP = object()
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024, queue_size: int = 1000,
+                 max_known: int = 100000):
+        """
+        初始化正文存储
+
+        Args:
+            directory: 存储目录，对象文件位于 objects/<哈希前两位>/<哈希>.gz
+            max_bytes: 单个正文保存的最大字节数，超出部分截断
+            queue_size: 待写入队列长度，写入跟不上时阻塞生产者
+            max_known: 内存中记住的最近对象哈希数，超出后淘汰最久未出现的，淘汰后按对象文件是否存在判断
+        """
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.max_bytes = max_bytes
+        self.queue_size = queue_size
+        self.index_path = None
+        # 最近写过的对象哈希（LRU），重复内容不必再检查磁盘
+        self.max_known = max_known
+        self.known: 'OrderedDict[str, None]' = OrderedDict()
+        self.stored = 0
+        self.deduplicated = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._index = None
+        self._thread = None
+
+    def open(self, index_name: str = 'index.jsonl', resume: bool = False):
+        """
+        打开索引文件并启动后台写入线程，续扫时追加写入索引
+        """
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.index_path = os.path.join(self.directory, index_name)
+        self._index = open(self.index_path, 'a' if resume else 'w', encoding='utf-8', buffering=1024 * 1024)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = threading.Thread(target=self._run, name='BodyStore', daemon=True)
+        self._thread.start()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    def put(self, url: str, status_code: int, body: bytes) -> Optional[str]:
+        """
+        提交一个命中结果的正文，由后台线程压缩写盘
+
+        Returns:
+            正文的SHA-256哈希，存储未打开时返回None
+        """
+        if self._queue is None:
+            return None
+        body = body[:self.max_bytes]
+        digest = hashlib.sha256(body).hexdigest()
+        self._queue.put((url, status_code, digest, body))
+        return digest
+
+    def _store_object(self, digest: str, body: bytes):
+        """
+        写入对象文件，内容已存在时跳过
+        """
+        with self._lock:
+            self.raw_bytes += len(body)
+            if digest in self.known:
+                self.known.move_to_end(digest)
+                self.deduplicated += 1
+                return
+            self.known[digest] = None
+            if len(self.known) > self.max_known:
+                self.known.popitem(last=False)
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            # 之前的扫描或其他进程已经写过相同内容
+            with self._lock:
+                self.deduplicated += 1
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(body, compresslevel=6, mtime=0)
+        # 先写临时文件再改名，多进程同时写同一对象时不会读到半个文件
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stored += 1
+            self.compressed_bytes += len(data)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            url, status_code, digest, body = item
+            try:
+                self._store_object(digest, body)
+            except OSError as e:
+                print(f"[!] 保存响应正文失败: {url}: {e}")
+                continue
+            self._index.write(json.dumps({
+                'url': url,
+                'status_code': status_code,
+                'hash': digest,
+                'size': len(body),
+                'truncated': len(body) >= self.max_bytes,
+            }, ensure_ascii=False) + '\n')
+        self._index.flush()
+
+    def close(self):
+        """
+        写完队列中剩余的正文并关闭索引文件
+        """
+        if self._queue is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._index.close()
+        self._queue = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'stored': self.stored,
+                'deduplicated': self.deduplicated,
+                'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+            }
+
+    def merge(self, stats: Dict):
+        with self._lock:
+            self.stored += stats['stored']
+            self.deduplicated += stats['deduplicated']
+            self.raw_bytes += stats['raw_bytes']
+            self.compressed_bytes += stats['compressed_bytes']
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+批量异步DNS解析
+在端口/HTTP探测之前解析所有域名：无法解析的域名直接丢弃，
+解析结果按记录TTL缓存，并按IP对域名分组，使同一IP的端口存活只需探测一次
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+    HAS_DNSPYTHON = True
+except ImportError:
+    HAS_DNSPYTHON = False
+
+
+class DnsResolver:
+    def __init__(self, concurrency: int = 200, timeout: float = 3.0, default_ttl: int = 300,
+                 negative_ttl: int = 60):
+        """
+        初始化DNS解析器
+
+        Args:
+            concurrency: 同时进行的DNS查询数
+            timeout: 单次查询超时时间（秒）
+            default_ttl: 无法获得记录TTL时（系统解析器）使用的缓存时间（秒）
+            negative_ttl: 解析失败结果的缓存时间（秒）
+        """
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        # 缓存: 域名 -> (过期时间, IP列表)
+        self.cache: Dict[str, Tuple[float, List[str]]] = {}
+        self.resolver = dns.asyncresolver.Resolver() if HAS_DNSPYTHON else None
+
+    async def query(self, host: str) -> Tuple[List[str], int]:
+        """
+        查询域名的A记录
+
+        Returns:
+            (IP列表, TTL)
+        """
+        if self.resolver is not None:
+            try:
+                answer = await self.resolver.resolve(host, 'A', lifetime=self.timeout)
+                return [record.address for record in answer], answer.rrset.ttl
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers,
+                    dns.exception.Timeout):
+                return [], self.negative_ttl
+
+        # 未安装dnspython时使用系统解析器，TTL不可得，使用默认缓存时间
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM),
+                timeout=self.timeout
+            )
+        except (asyncio.TimeoutError, OSError):
+            return [], self.negative_ttl
+        return list(dict.fromkeys(info[4][0] for info in infos)), self.default_ttl
+
+    async def resolve(self, host: str) -> List[str]:
+        """
+        解析单个域名（带缓存）
+
+        Returns:
+            IP列表，无法解析时为空列表
+        """
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        cached = self.cache.get(host)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        try:
+            ips, ttl = await self.query(host)
+        except Exception:
+            ips, ttl = [], self.negative_ttl
+        self.cache[host] = (time.monotonic() + ttl, ips)
+        return ips
+
+    def prune(self):
+        """
+        清理已过期的缓存条目，避免长时间扫描时缓存无限增长
+        """
+        now = time.monotonic()
+        self.cache = {host: entry for host, entry in self.cache.items() if entry[0] > now}
+
+    async def resolve_all(self, hosts: Iterable[str], exit_handler=None) -> Dict[str, List[str]]:
+        """
+        并发解析所有域名
+
+        Returns:
+            {域名: IP列表}，无法解析的域名IP列表为空
+        """
+        results = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+
+        async def resolve_one(host: str):
+            results[host] = await self.resolve(host)
+
+        def on_done(task: asyncio.Task):
+            pending.discard(task)
+            semaphore.release()
+
+        for host in hosts:
+            if exit_handler is not None and exit_handler.exit_now:
+                break
+            if host in results:
+                continue
+            results[host] = []
+            await semaphore.acquire()
+            task = asyncio.create_task(resolve_one(host))
+            pending.add(task)
+            task.add_done_callback(on_done)
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return results
+
+    def resolve_all_sync(self, hosts: Iterable[str], exit_handler=None) -> Dict[str, List[str]]:
+        """
+        同步版本的resolve_all，供线程引擎使用
+        """
+        return asyncio.run(self.resolve_all(hosts, exit_handler))
+
+    @staticmethod
+    def group_by_ip(domain_ips: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        按IP对域名分组
+
+        Returns:
+            {IP: 解析到该IP的域名列表}
+        """
+        groups = {}
+        for domain, ips in domain_ips.items():
+            for ip in ips:
+                groups.setdefault(ip, []).append(domain)
+        return groups
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+按主机/IP的礼貌调度器
+把工作单元在多个主机之间交错排列，避免同一主机（或同一WAF后的IP）在短时间内
+收到成批请求；并按主机限制请求速率和同时在途的请求数。
+主机放行在分发工作单元时进行：主机忙时它的单元暂存，先分发其他主机的单元，
+等待主机放行的单元不占用全局并发名额
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+
+class HostScheduler:
+    # 暂存单元的主机都达到在途上限时，等待单元完成的最长时间（秒）
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, rate: float = 0, max_in_flight: int = 0, window: int = 1000):
+        """
+        初始化调度器
+
+        Args:
+            rate: 单个主机每秒最多请求数，0表示不限制
+            max_in_flight: 单个主机同时在途的最大请求数，0表示不限制
+            window: 交错排列时每次读入的工作单元数，也是分发时最多暂存的单元数
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_in_flight = max_in_flight
+        self.window = max(1, window)
+        self.in_flight: Dict[str, int] = {}
+        self.next_allowed: Dict[str, float] = {}
+        self.waits = 0
+        self._lock = threading.Lock()
+        # 线程引擎：当前线程的工作单元已在分发时获准发送第一个请求的主机
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 or self.max_in_flight > 0
+
+    def interleave(self, items: Iterable, key_func: Callable) -> Iterator:
+        """
+        按主机轮转输出工作单元：每个窗口内依次从每个主机取一个单元
+        """
+        items = iter(items)
+        while True:
+            window = list(islice(items, self.window))
+            if not window:
+                return
+            queues = OrderedDict()
+            for item in window:
+                queues.setdefault(key_func(item), deque()).append(item)
+            while queues:
+                for key in list(queues):
+                    queue = queues[key]
+                    yield queue.popleft()
+                    if not queue:
+                        del queues[key]
+
+    def try_admit(self, key: str) -> float:
+        """
+        非阻塞地尝试放行主机的一个工作单元，成功时占用一个在途名额并消耗一次发送间隔
+
+        Returns:
+            0表示已放行；大于0为距离该主机可以发送的秒数；-1表示在途请求已达上限
+        """
+        with self._lock:
+            in_flight = self.in_flight.get(key, 0)
+            if self.max_in_flight and in_flight >= self.max_in_flight:
+                return -1
+            if self.interval:
+                now = time.monotonic()
+                delay = self.next_allowed.get(key, 0.0) - now
+                if delay > 0:
+                    return delay
+                self.next_allowed[key] = now + self.interval
+            self.in_flight[key] = in_flight + 1
+            return 0.0
+
+    def dispatch(self, items: Iterable, key_func: Callable) -> Iterator[Tuple]:
+        """
+        按主机是否空闲分发工作单元：主机达到在途上限或未到发送时间时暂存它的单元，先分发其他主机的单元
+
+        Yields:
+            (单元, 主机键)：主机已放行，单元完成后调用方需要release(主机键)；未启用限制时主机键为None。
+            (None, 等待秒数)：暂时没有可分发的单元，调用方等待有单元完成或等待时间到达后继续迭代
+        """
+        items = iter(items)
+        if not self.enabled:
+            for item in items:
+                yield item, None
+            return
+        deferred: 'OrderedDict[str, deque]' = OrderedDict()
+        deferred_count = 0
+        exhausted = False
+        end = object()
+        while True:
+            admitted = False
+            wait = self.POLL_INTERVAL
+            # 先按暂存顺序分发已经空闲的主机的单元
+            for key in list(deferred):
+                delay = self.try_admit(key)
+                if delay == 0:
+                    queue = deferred[key]
+                    item = queue.popleft()
+                    deferred_count -= 1
+                    if not queue:
+                        del deferred[key]
+                    admitted = True
+                    yield item, key
+                elif delay > 0:
+                    wait = min(wait, delay)
+            # 再读入新的单元，同一主机已有暂存单元时排在其后，保持主机内的顺序
+            while not exhausted and deferred_count < self.window:
+                item = next(items, end)
+                if item is end:
+                    exhausted = True
+                    break
+                key = key_func(item)
+                delay = -1 if key in deferred else self.try_admit(key)
+                if delay == 0:
+                    admitted = True
+                    yield item, key
+                    continue
+                deferred.setdefault(key, deque()).append(item)
+                deferred_count += 1
+                with self._lock:
+                    self.waits += 1
+                if delay > 0:
+                    wait = min(wait, delay)
+            if exhausted and not deferred:
+                return
+            if not admitted:
+                yield None, wait
+
+    def grant(self, key):
+        """
+        线程引擎：标记当前线程的工作单元已在分发时获准向该主机发送第一个请求，None表示清除
+        """
+        self._local.granted = key
+
+    def pace(self, key: str):
+        """
+        线程引擎：按速率间隔发送工作单元中的请求（一个单元包含同一域名多个端口的请求），
+        第一个请求已在分发时放行，不再等待
+        """
+        if not self.interval:
+            return
+        if getattr(self._local, 'granted', None) == key:
+            self._local.granted = None
+            return
+        delay = self._reserve(key)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def pace_async(self, key: str):
+        """
+        异步引擎：工作单元中额外的请求（如虚拟主机基线）按速率间隔发送
+        """
+        if not self.interval:
+            return
+        delay = self._reserve(key)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reserve(self, key: str) -> float:
+        """
+        预约该主机的下一个发送时间
+
+        Returns:
+            距离预约时间的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self.next_allowed.get(key, 0.0))
+            self.next_allowed[key] = send_at + self.interval
+        return send_at - now
+
+    def release(self, key: str):
+        with self._lock:
+            in_flight = self.in_flight.get(key, 1) - 1
+            if in_flight > 0:
+                self.in_flight[key] = in_flight
+            else:
+                self.in_flight.pop(key, None)
+            self._prune()
+
+    def _prune(self):
+        """
+        定期清理已空闲主机的调度状态，避免大列表扫描时状态无限增长
+        """
+        now = time.monotonic()
+        if now - self._last_prune < 10:
+            return
+        self._last_prune = now
+        self.next_allowed = {key: at for key, at in self.next_allowed.items()
+                             if at > now or key in self.in_flight}
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+线程安全的HTTP连接池客户端
+所有工作线程共享同一个按主机划分的keep-alive连接池，
+同一源站的后续请求复用已建立的TCP/TLS连接，并统计连接池命中/未命中次数；
+传入LatencyStats时新建连接的DNS解析、TCP连接和TLS握手耗时分别计入统计；
+按IP请求并指定Host请求头时（虚拟主机模式），HTTPS连接的SNI使用Host中的域名
+"""
+
+import socket
+import threading
+import time
+from typing import Dict, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import HTTPError
+
+
+class TimedConnectionMixin:
+    """
+    新建连接时分别记录DNS解析和TCP连接耗时；
+    从建立连接（或从连接池取出后发送请求）到归还连接池期间登记为当前线程的活动连接，
+    截止时间到达时可以从其他线程关闭
+    """
+    latency = None
+    client = None
+    # 当前持有该连接的线程ID，归还连接池后为None
+    active_thread = None
+
+    def connect(self):
+        # TCP连接和TLS握手期间也要能被看门狗打断
+        self.client.set_active(self)
+        super().connect()
+
+    def request(self, *args, **kwargs):
+        self.client.set_active(self)
+        return super().request(*args, **kwargs)
+
+    def _new_conn(self):
+        timeout = self.timeout
+        # 阻塞中的connect无法从其他线程打断，连接超时不超过当前探测的剩余时间
+        self.timeout = self.client.connect_timeout(timeout)
+        try:
+            if self.latency is None:
+                return super()._new_conn()
+            return self._timed_new_conn()
+        finally:
+            self.timeout = timeout
+
+    def _timed_new_conn(self):
+        dns_host = self._dns_host
+        start = time.monotonic()
+        try:
+            # 先单独解析，DNS耗时才能和TCP连接耗时分开；解析失败时交给原实现处理和报错
+            self._dns_host = socket.getaddrinfo(dns_host, self.port, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+        except (OSError, UnicodeError):
+            pass
+        resolved = time.monotonic()
+        self.latency.observe_connection('dns', resolved - start, self.host)
+        try:
+            sock = super()._new_conn()
+            self._tcp_time = time.monotonic() - start
+            return sock
+        finally:
+            self._dns_host = dns_host
+            # 连接超时、被拒绝的耗时也要记录，否则直方图缺少最慢的那部分
+            self.latency.observe_connection('connect', time.monotonic() - resolved, self.host)
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        # connect中先调用_new_conn建立TCP连接，剩余时间为TLS握手
+        start = time.monotonic()
+        self._tcp_time = None
+        try:
+            super().connect()
+        finally:
+            # TCP连接成功后握手失败的耗时同样记录；TCP连接失败时已由_new_conn记录
+            if self.latency is not None and self._tcp_time is not None:
+                self.latency.observe_connection('tls', time.monotonic() - start - self._tcp_time, self.host)
+
+
+class TrackedPoolMixin:
+    """连接归还连接池时注销活动连接，之后该连接可能被其他线程取用"""
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            self.ConnectionCls.client.clear_active(conn)
+        super()._put_conn(conn)
+
+
+class HostRoutingAdapter(HTTPAdapter):
+    """
+    请求URL为IP、显式指定Host请求头时，TLS握手的SNI使用Host中的域名；
+    HTTPS连接池按(IP, 端口, SNI)划分，HTTP请求同一IP上的所有域名共用连接
+    """
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        host = request.headers.get('Host')
+        if host and host_params['scheme'] == 'https':
+            pool_kwargs['server_hostname'] = host.partition(':')[0]
+            pool_kwargs['assert_hostname'] = False
+        return host_params, pool_kwargs
+
+
+class HttpClientPool:
+    def __init__(self, headers: Dict[str, str], pool_connections: int = 256, pool_maxsize: int = 10,
+                 max_drain_bytes: int = 64 * 1024, latency=None):
+        """
+        初始化连接池客户端
+
+        Args:
+            headers: 每个请求携带的默认请求头
+            pool_connections: 最多缓存多少个主机的连接池
+            pool_maxsize: 单个主机连接池保留的最大连接数
+            max_drain_bytes: 响应剩余内容不超过该值时读完并归还连接，否则直接关闭
+            latency: LatencyStats实例，用于记录建连各阶段耗时
+        """
+        self.headers = headers
+        self.max_drain_bytes = max_drain_bytes
+        self.adapter = HostRoutingAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   pool_block=False, max_retries=0)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 被淘汰的主机连接池的计数累加到这里，避免统计丢失
+        self._evicted_requests = 0
+        self._evicted_connections = 0
+
+        # 线程ID -> 该线程当前持有的连接
+        self._active_connections = {}
+        self._active_lock = threading.Lock()
+
+        pools = self.adapter.poolmanager.pools
+        pools.dispose_func = self._on_pool_dispose
+        self.install_connection_classes(latency)
+
+    def install_connection_classes(self, latency=None):
+        """
+        让连接池使用记录建连耗时、登记活动连接的连接类
+        """
+        attrs = {'latency': latency, 'client': self}
+        http_connection = type('TimedHTTPConnection', (TimedHTTPConnection,), attrs)
+        https_connection = type('TimedHTTPSConnection', (TimedHTTPSConnection,), attrs)
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            'http': type('TimedHTTPConnectionPool', (TrackedPoolMixin, HTTPConnectionPool),
+                         {'ConnectionCls': http_connection}),
+            'https': type('TimedHTTPSConnectionPool', (TrackedPoolMixin, HTTPSConnectionPool),
+                          {'ConnectionCls': https_connection}),
+        }
+
+    def _on_pool_dispose(self, pool):
+        with self._lock:
+            self._evicted_requests += pool.num_requests
+            self._evicted_connections += pool.num_connections
+        pool.close()
+
+    def get_session(self) -> requests.Session:
+        """
+        获取当前线程的Session，所有Session挂载同一个适配器以共享连接池
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.get_session().get(url, **kwargs)
+
+    def set_deadline(self, deadline: float):
+        """
+        设置当前线程探测的截止时间（time.monotonic()时刻），0表示不限制
+        """
+        self._local.deadline = deadline
+
+    def connect_timeout(self, timeout):
+        """
+        新建连接的超时时间，不超过当前线程探测的剩余时间
+        """
+        deadline = getattr(self._local, 'deadline', 0)
+        if not deadline or not isinstance(timeout, (int, float)):
+            return timeout
+        return max(0.01, min(timeout, deadline - time.monotonic()))
+
+    def set_active(self, connection):
+        thread_id = threading.get_ident()
+        with self._active_lock:
+            self._active_connections[thread_id] = connection
+            connection.active_thread = thread_id
+
+    def clear_active(self, connection):
+        """
+        连接不再被任何线程持有（已归还连接池）
+        """
+        with self._active_lock:
+            thread_id = connection.active_thread
+            if thread_id is not None and self._active_connections.get(thread_id) is connection:
+                del self._active_connections[thread_id]
+            connection.active_thread = None
+
+    def clear_thread(self):
+        """
+        当前线程的请求结束，注销它持有的连接
+        """
+        with self._active_lock:
+            connection = self._active_connections.pop(threading.get_ident(), None)
+            if connection is not None:
+                connection.active_thread = None
+
+    def abort_thread(self, thread_id: int):
+        """
+        关闭指定线程仍持有的连接，使阻塞中的TLS握手或读取立即失败
+        """
+        with self._active_lock:
+            connection = self._active_connections.get(thread_id)
+            if connection is None or connection.active_thread != thread_id:
+                return
+            sock = connection.sock
+            if sock is None:
+                return
+            try:
+                # 绕过SSLSocket.shutdown，直接关闭底层TCP连接
+                socket.socket.shutdown(sock, socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def iter_body(self, response: requests.Response, chunk_size: int = 8192) -> Iterator[bytes]:
+        """
+        流式读取响应正文，有数据到达就立即返回，便于调用方及时检查截止时间和传输速率
+        """
+        raw = response.raw
+        if not hasattr(raw, 'read1'):
+            yield from response.iter_content(chunk_size=chunk_size)
+            return
+        while True:
+            try:
+                chunk = raw.read1(chunk_size, decode_content=True)
+            except HTTPError as e:
+                raise requests.exceptions.ConnectionError(e)
+            if not chunk:
+                break
+            yield chunk
+
+    def release(self, response: requests.Response):
+        """
+        归还响应占用的连接
+        剩余内容较少时读完剩余数据使连接可被复用，否则关闭连接；
+        分块传输的响应不知道剩余长度，最多读取max_drain_bytes，读到结尾才归还
+        """
+        raw = response.raw
+        try:
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) - raw.tell() <= self.max_drain_bytes:
+                raw.drain_conn()
+                raw.release_conn()
+            elif raw.chunked and self.drain_chunked(raw):
+                raw.release_conn()
+            else:
+                response.close()
+        except Exception:
+            response.close()
+        finally:
+            self.clear_thread()
+
+    def drain_chunked(self, raw) -> bool:
+        """
+        读完分块传输响应的剩余数据，超过max_drain_bytes时放弃
+
+        Returns:
+            是否已读到响应结尾
+        """
+        drained = 0
+        while drained <= self.max_drain_bytes:
+            data = raw.read(8192)
+            if not data:
+                return True
+            drained += len(data)
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        返回连接池统计信息
+
+        Returns:
+            {'requests': 请求数, 'hits': 复用连接次数, 'misses': 新建连接次数}
+        """
+        pools = self.adapter.poolmanager.pools
+        with self._lock:
+            total_requests = self._evicted_requests
+            total_connections = self._evicted_connections
+        with pools.lock:
+            active_pools = [pools[key] for key in pools.keys()]
+        for pool in active_pools:
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+        return {
+            'requests': total_requests,
+            'hits': max(0, total_requests - total_connections),
+            'misses': total_connections,
+        }
+
+    def close(self):
+        self.adapter.close()
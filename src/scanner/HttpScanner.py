@@ -6,15 +6,39 @@ HTTP扫描器
 """
 
 import requests
+import asyncio
+import os
+import threading
 import concurrent.futures
+import multiprocessing
+import queue
 import sys
 import time
 import signal
 from urllib.parse import urlparse, urljoin
-from typing import List, Dict, Tuple
+from itertools import islice
+from typing import List, Dict, Tuple, Iterable, Iterator, Callable
 import argparse
-from bs4 import BeautifulSoup
-import re
+
+from scanner.AsyncHttpEngine import AsyncHttpEngine
+from scanner.HttpClientPool import HttpClientPool
+from scanner.TitleSniffer import TitleSniffer
+from scanner.PortProbe import PortProbe
+from scanner.DnsResolver import DnsResolver
+from scanner.ScanJournal import ScanJournal
+from scanner.ResultSink import ResultSink
+from scanner.AdaptiveLimiter import AdaptiveLimiter
+from scanner.HostScheduler import HostScheduler
+from scanner.ResponseFingerprint import FingerprintIndex
+from scanner.ResponseAnalysis import ResponseAnalysis
+from scanner.RedirectResolver import RedirectResolver
+from scanner.ShardWorker import ShardWorker
+from scanner.LatencyStats import LatencyStats
+from scanner.ProbeDeadline import ProbeAborted, ProbeDeadline, DeadlineWatchdog
+from scanner.VhostBaseline import VhostBaseline
+from scanner.PathProbe import PathProbe
+from scanner.TechFingerprint import TechMatcher
+from scanner.BodyStore import BodyStore
 
 # 忽略SSL警告
 requests.packages.urllib3.disable_warnings(
@@ -33,16 +57,69 @@ class GracefulExit:
         self.exit_now = True
 
 class HttpScanner:
-    def __init__(self, timeout: int = 5, max_workers: int = 10):
+    # 命令行端口列表中未指定协议时默认使用https的端口
+    TLS_PORTS = {443, 4443, 8443, 8444, 9443}
+
+    def __init__(self, timeout: int = 5, max_workers: int = 10, min_workers: int = 1,
+                 engine: str = 'async', pool_size: int = 0,
+                 preprobe: bool = False, connect_timeout: float = 1.0, probe_concurrency: int = 500,
+                 resolve_dns: bool = False, dns_concurrency: int = 200,
+                 journal_file: str = None, resume: bool = False, batch_size: int = 10000,
+                 results_format: str = 'jsonl', host_rate: float = 0, host_concurrency: int = 0,
+                 cluster_threshold: int = 3, max_redirects: int = 0,
+                 ports: List[Tuple[int, str]] = None, detect_protocol: bool = False,
+                 processes: int = 1, metrics_file: str = None,
+                 probe_deadline: float = None, host_deadline: float = 0, min_transfer_rate: float = 0,
+                 vhost: bool = False, path_wordlist: str = None,
+                 tech: bool = False, tech_signatures: List[str] = None,
+                 body_store: str = None, body_store_limit: int = 512 * 1024):
         """
         初始化HTTP扫描器
         
         Args:
             timeout: 请求超时时间（秒）
-            max_workers: 最大并发线程数
+            max_workers: 最大并发数（线程引擎为线程数，异步引擎为同时进行的探测数）
+            min_workers: 最小并发数，实际并发数由自适应控制器在[min_workers, max_workers]之间调整
+            engine: 扫描引擎，'async' 为asyncio/aiohttp引擎，'thread' 为线程池引擎
+            pool_size: 单个主机保留的最大keep-alive连接数，0表示与max_workers一致
+            preprobe: 是否在HTTP请求前先做TCP connect端口预探测
+            connect_timeout: 端口预探测的连接超时时间（秒）
+            probe_concurrency: 端口预探测的并发连接数
+            resolve_dns: 是否在探测前批量解析域名，丢弃无法解析的域名并按IP去重端口探测
+            dns_concurrency: DNS解析并发数
+            journal_file: 检查点日志路径，默认为 <输入文件>.journal
+            resume: 是否从检查点日志继续上次中断的扫描
+            batch_size: 启用DNS解析/端口预探测/敏感路径探测时每批处理的域名数
+            results_format: 流式结果文件格式，'jsonl' 或 'csv'
+            host_rate: 单个主机（已解析时为IP）每秒最多请求数，0表示不限制
+            host_concurrency: 单个主机同时在途的最大请求数，0表示不限制
+            cluster_threshold: 相同响应指纹出现超过该次数后在控制台和报告中折叠
+            max_redirects: 3xx响应最多继续跟随的跳转次数，0表示只记录第一跳
+            ports: 要探测的(端口, 协议)列表，默认为常见HTTP/HTTPS端口，可由parse_ports从命令行解析
+            detect_protocol: 是否在端口预探测时识别每个端口实际使用的协议（隐含开启端口预探测）
+            processes: 扫描进程数，大于1时输入按域名哈希分片，每个进程运行独立的扫描引擎
+            metrics_file: 扫描结束时以Prometheus文本格式写出分阶段延迟统计的文件
+            probe_deadline: 单个探测（含读取正文和跟随跳转）的墙钟截止时间（秒），None表示timeout的3倍，0表示不限制
+            host_deadline: 单个主机所有探测的累计耗时预算（秒），用完后跳过该主机剩余的探测，0表示不限制
+            min_transfer_rate: 读取正文的最低速率（字节/秒），低于该速率的慢速响应被中止，0表示不检查
+            vhost: 虚拟主机模式，域名按解析到的IP分组，通过Host请求头和SNI复用到该IP的连接，
+                并与该IP默认站点的基线响应比较（隐含开启DNS解析）
+            path_wordlist: 敏感路径字典文件，指定时在根路径探测后对每个存活源站探测字典中的路径
+            tech: 是否根据特征库识别响应使用的技术栈，结果写入tech字段
+            tech_signatures: 技术栈特征文件列表（隐含开启tech），默认使用内置特征库
+            body_store: 响应正文存储目录，指定时命中结果的正文按内容哈希压缩去重保存
+            body_store_limit: 单个正文保存的最大字节数
         """
+        # 子进程按同样的参数构建各自的扫描器
+        self.init_args = {name: value for name, value in locals().items() if name != 'self'}
+        self.processes = max(1, processes)
+        self.shard = None
+        self.shard_stats = []
+        
         self.timeout = timeout
-        self.max_workers = max_workers
+        self.engine = engine
+        self.pool_size = pool_size
+        self.set_worker_limits(min_workers, max_workers)
         self.exit_handler = GracefulExit()
         
         # 重点关注的状态码及其描述
@@ -65,7 +142,7 @@ class HttpScanner:
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
             'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'close',
+            'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
         
@@ -83,8 +160,198 @@ class HttpScanner:
             (9080, 'http'),
         ]
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # 探测墙钟截止时间、主机耗时预算和最低传输速率，防止tarpit占住并发名额
+        self.deadline_auto = probe_deadline is None
+        if self.deadline_auto:
+            probe_deadline = self.timeout * 3
+        self.deadlines = ProbeDeadline(probe_deadline, host_deadline, min_transfer_rate)
+        self.watchdog = DeadlineWatchdog()
+        
+        # 分阶段延迟统计（DNS、连接、TLS、首字节、正文）
+        self.latency = LatencyStats()
+        self.metrics_file = metrics_file
+        
+        # 所有线程共享的keep-alive连接池，单主机连接数默认与最大并发数一致
+        self.pool = HttpClientPool(self.headers, pool_maxsize=self.pool_size or self.max_workers,
+                                   latency=self.latency)
+        self.pool_stats = {}
+        
+        self.ports = ports or self.common_ports
+        
+        # TCP端口预探测，open_ports为None表示不过滤端口
+        # 开启协议识别时预探测顺带识别协议，结果按(IP, 端口)缓存，跨批次复用
+        preprobe = preprobe or detect_protocol
+        self.port_probe = PortProbe(connect_timeout, probe_concurrency, detect_protocol) if preprobe else None
+        self.open_ports = None
+        self.port_protocols: Dict[Tuple[str, int], str] = {}
+        
+        # DNS解析阶段，domain_ips为None表示未做解析
+        resolve_dns = resolve_dns or vhost
+        self.dns_resolver = DnsResolver(dns_concurrency, timeout=min(self.timeout, 3)) if resolve_dns else None
+        self.domain_ips = None
+        
+        # 检查点日志，在scan_from_file中根据输入文件打开
+        self.journal_file = journal_file
+        self.resume = resume
+        self.journal = None
+        
+        # 输入按流读取，启用整批处理的阶段时按批次推进
+        self.batch_size = max(1, batch_size)
+        self.domain_count = 0
+        
+        # 流式结果写入，命中结果不在内存中累积，只保留各状态码的计数
+        self.results_format = results_format
+        self.sink = None
+        self.hit_counts = {}
+        self._hit_lock = threading.Lock()
+        
+        # 按主机交错调度工作单元，并限制单主机速率和在途请求数
+        self.scheduler = HostScheduler(host_rate, host_concurrency)
+        
+        # 技术栈识别，所有特征编译为多模式匹配器，每个响应正文只扫描一遍
+        self.tech = TechMatcher(tech_signatures) if tech or tech_signatures else None
+        
+        # 命中结果的正文存储，在scan_stream中打开
+        self.body_store = BodyStore(body_store, body_store_limit) if body_store else None
+        
+        # 响应指纹索引，用于聚类泛解析/停放页等重复响应
+        self.fingerprints = FingerprintIndex(cluster_threshold=cluster_threshold)
+        
+        # 跳转链解析，已解析的跳转和落地页在所有主机间共享
+        self.redirects = RedirectResolver(max_redirects)
+        
+        # 虚拟主机模式下各(IP, 端口, 协议)默认站点的基线响应
+        self.vhosts = VhostBaseline() if vhost else None
+        
+        # 敏感路径探测阶段，按批次对根路径探测发现的存活源站执行
+        self.path_probe = PathProbe(PathProbe.load_wordlist(path_wordlist)) if path_wordlist else None
+
+    def set_worker_limits(self, min_workers: int, max_workers: int):
+        """
+        设置并发上下限并重建自适应并发控制器
+        """
+        self.max_workers = max(1, max_workers)
+        self.min_workers = min(max(1, min_workers), self.max_workers)
+        self.limiter = AdaptiveLimiter(self.min_workers, self.max_workers)
+
+    def get_probe_hosts(self, domain: str) -> List[str]:
+        """
+        返回端口存活探测使用的主机：已做DNS解析时为域名的IP列表，否则为域名本身
+        """
+        if self.domain_ips is None:
+            return [domain]
+        return self.domain_ips.get(domain) or [domain]
+
+    def get_host_key(self, domain: str) -> str:
+        """
+        返回礼貌调度使用的主机标识：已做DNS解析时为第一个IP，否则为域名
+        """
+        return self.get_probe_hosts(domain)[0]
+
+    @classmethod
+    def parse_ports(cls, spec: str) -> List[Tuple[int, str]]:
+        """
+        解析端口列表，如 "80,443,8000-8100,8081:https"
+        端口可写成范围，后缀 ":http"/":https" 指定协议，未指定时按常见端口习惯推断
+
+        Returns:
+            去重后的(端口, 协议)列表
+        """
+        ports = {}
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            item, _, protocol = item.partition(':')
+            protocol = protocol.strip().lower()
+            if protocol and protocol not in ('http', 'https'):
+                raise ValueError(f"无效的协议: {protocol}")
+            start, _, end = item.partition('-')
+            start, end = int(start), int(end or start)
+            if not 0 < start <= end <= 65535:
+                raise ValueError(f"无效的端口范围: {item}")
+            for port in range(start, end + 1):
+                ports[port] = protocol or ('https' if port in cls.TLS_PORTS else 'http')
+        if not ports:
+            raise ValueError("端口列表为空")
+        return list(ports.items())
+
+    def get_ports(self, domain: str) -> List[Tuple[int, str]]:
+        """
+        返回需要对该域名做HTTP探测的(端口, 协议)列表
+        启用端口预探测时只返回开放的端口，识别出协议的端口使用识别结果
+        """
+        ports = self.ports
+        if self.journal is not None:
+            ports = [(port, protocol) for port, protocol in ports if not self.journal.is_done(domain, port)]
+        if self.open_ports is None:
+            return ports
+        hosts = self.get_probe_hosts(domain)
+        detected = []
+        for port, protocol in ports:
+            found = [self.open_ports[(host, port)] for host in hosts if (host, port) in self.open_ports]
+            if found:
+                detected.append((port, next((p for p in found if p), protocol)))
+        return detected
+
+    def resolve_domains(self, domains: List[str]) -> List[str]:
+        """
+        批量解析域名，记录域名到IP的映射
+
+        Returns:
+            可解析的域名列表（已规范化、去重）
+        """
+        unique_domains = list(dict.fromkeys(d for d in map(self.normalize_domain, domains) if d))
+        print(f"[*] DNS解析: {len(unique_domains)} 个域名")
+        self.dns_resolver.prune()
+        start_time = time.time()
+        domain_ips = self.dns_resolver.resolve_all_sync(unique_domains, self.exit_handler)
+        self.domain_ips = {domain: ips for domain, ips in domain_ips.items() if ips}
+        
+        ip_groups = DnsResolver.group_by_ip(self.domain_ips)
+        dropped = len(unique_domains) - len(self.domain_ips)
+        if self.journal is not None:
+            for domain in unique_domains:
+                if domain not in self.domain_ips and domain in domain_ips:
+                    self.journal.record_skipped(domain, [port for port, _ in self.ports])
+        print(f"[*] DNS解析完成: 可解析 {len(self.domain_ips)} 个, 丢弃 {dropped} 个, "
+              f"共 {len(ip_groups)} 个唯一IP, 耗时 {time.time() - start_time:.1f}s")
+        return [domain for domain in unique_domains if domain in self.domain_ips]
+
+    def preprobe_ports(self, domains: List[str]):
+        """
+        批量TCP connect探测所有(主机, 端口)，记录开放的端口
+        已做DNS解析时按IP探测，同一IP上的所有域名共享探测结果
+        """
+        unique_domains = list(dict.fromkeys(d for d in map(self.normalize_domain, domains) if d))
+        hosts = list(dict.fromkeys(host for domain in unique_domains for host in self.get_probe_hosts(domain)))
+        
+        # 已识别过协议的(IP, 端口)直接复用缓存，不再连接
+        detect = self.port_probe.detect_protocol
+        targets = [(host, port) for host in hosts for port, _ in self.ports
+                   if not (detect and (host, port) in self.port_protocols)]
+        action = "端口预探测及协议识别" if detect else "端口预探测"
+        print(f"[*] {action}: {len(targets)} 个(主机, 端口), 连接超时 {self.port_probe.connect_timeout}s")
+        start_time = time.time()
+        self.open_ports = self.port_probe.sweep_sync(targets, self.exit_handler)
+        if detect:
+            self.port_protocols.update(self.open_ports)
+            self.open_ports.update({(host, port): self.port_protocols[(host, port)]
+                                    for host in hosts for port, _ in self.ports
+                                    if (host, port) in self.port_protocols})
+        if self.journal is not None and not self.exit_handler.exit_now:
+            for domain in unique_domains:
+                open_ports = {port for port, _ in self.get_ports(domain)}
+                self.journal.record_skipped(domain, [port for port, _ in self.ports if port not in open_ports])
+        alive_hosts = len({host for host, _ in self.open_ports})
+        summary = f"[*] {action}完成: 开放 {len(self.open_ports)} 个端口, 涉及 {alive_hosts} 个主机"
+        if detect:
+            default_protocols = dict(self.ports)
+            https_count = sum(1 for protocol in self.open_ports.values() if protocol == 'https')
+            corrected = sum(1 for (_, port), protocol in self.open_ports.items()
+                            if protocol and protocol != default_protocols[port])
+            summary += f", 其中https {https_count} 个, 协议与默认不同 {corrected} 个"
+        print(f"{summary}, 耗时 {time.time() - start_time:.1f}s")
 
     def normalize_domain(self, domain: str) -> str:
         """
@@ -99,46 +366,25 @@ class HttpScanner:
         domain = domain.rstrip('/')
         return domain
 
+    def create_title_sniffer(self, response_headers) -> TitleSniffer:
+        """
+        根据响应头创建流式标题嗅探器
+        """
+        content_length = response_headers.get('Content-Length', '')
+        return TitleSniffer(
+            content_type=response_headers.get('Content-Type', ''),
+            content_length=int(content_length) if content_length.isdigit() else 0,
+            max_length=1024 * 1024  # 最多读取1MB
+        )
+
     def extract_title(self, response_content: bytes, response_headers) -> str:
         """
         从响应内容中提取页面标题
         """
-        title = ""
-        
-        # 检查Content-Type，只处理HTML内容
-        content_type = response_headers.get('Content-Type', '').lower()
-        if 'text/html' not in content_type:
-            return "非HTML内容"
-        
-        try:
-            # 尝试多种编码
-            encodings = ['utf-8', 'gbk', 'gb2312', 'iso-8859-1', 'big5']
-            html_content = None
-            
-            for encoding in encodings:
-                try:
-                    html_content = response_content.decode(encoding, errors='ignore')
-                    break
-                except:
-                    continue
-            
-            if html_content:
-                # 使用BeautifulSoup提取标题
-                soup = BeautifulSoup(html_content, 'html.parser')
-                title_tag = soup.title
-                if title_tag and title_tag.string:
-                    title = title_tag.string.strip()
-                    # 清理标题中的空白字符
-                    title = re.sub(r'\s+', ' ', title)
-                    # 截断过长的标题
-                    if len(title) > 50:
-                        title = title[:47] + "..."
-                else:
-                    title = "无标题"
-        except Exception:
-            title = "标题提取失败"
-        
-        return title
+        sniffer = self.create_title_sniffer(response_headers)
+        if sniffer.is_html:
+            sniffer.feed(response_content)
+        return sniffer.get_title()
 
     def get_status_color(self, status_code: int) -> str:
         """
@@ -159,67 +405,458 @@ class HttpScanner:
         }
         return colors.get(status_code, '\033[0m')
 
-    def test_url(self, url: str) -> Tuple[bool, int, str, str, str, str]:
+    def build_url(self, domain: str, port: int, protocol: str) -> str:
+        """
+        根据域名、端口和协议构建URL
+        """
+        if protocol == 'https':
+            return f"https://{domain}:{port}"
+        return f"http://{domain}:{port}"
+
+    def route_request(self, url: str) -> Tuple[str, str]:
+        """
+        虚拟主机模式下把URL中的域名换成解析到的IP
+
+        Returns:
+            (实际请求的URL, Host请求头)，非虚拟主机模式或域名未解析时原样返回，Host为空
+        """
+        if self.vhosts is None or not self.domain_ips:
+            return url, ""
+        parsed = urlparse(url)
+        ips = self.domain_ips.get(parsed.hostname)
+        if not ips:
+            return url, ""
+        return parsed._replace(netloc=f"{ips[0]}:{parsed.port}").geturl(), parsed.netloc
+
+    def get_redirect_url(self, url: str, status_code: int, response_headers) -> str:
+        """
+        从响应头中提取跳转URL（处理相对路径的跳转）
+        """
+        if status_code not in [301, 302, 307, 308]:
+            return ""
+        location = response_headers.get('Location', '')
+        if not location:
+            return ""
+        if location.startswith('/'):
+            return urljoin(url, location)
+        elif location.startswith(('http://', 'https://')):
+            return location
+        return urljoin(url, '/' + location.lstrip('/'))
+
+    def build_result(self, domain: str, url: str, status_code: int, title: str,
+                     redirect_url: str, port: int, protocol: str) -> Dict:
+        """
+        构建单条扫描结果
+        """
+        return {
+            'domain': domain,
+            'url': url,
+            'status_code': status_code,
+            'title': title,
+            'redirect_url': redirect_url,
+            'port': port,
+            'protocol': protocol,
+            'description': self.target_status_codes[status_code]
+        }
+
+    def format_result(self, result: Dict) -> str:
+        """
+        将单条结果格式化为一行显示信息
+        """
+        status_code = result['status_code']
+        status_color = self.get_status_color(status_code)
+        reset_color = "\033[0m"
+        
+        # 根据状态码构建显示信息
+        status_display = f"{status_color}[{status_code}]{reset_color}"
+        url_display = result['url']
+        if result.get('vhost_ip'):
+            url_display += f" @{result['vhost_ip']}"
+        url_display = url_display.ljust(45)
+        
+        # 对于不同状态码，显示不同信息
+        if status_code == 200:
+            display_title = result['title'] if result['title'] else "无标题"
+            line = f"    {status_display} {url_display} | {display_title}"
+        elif status_code in [301, 302, 307, 308]:
+            if result.get('final_url'):
+                final_title = f" {result['final_title']}" if result.get('final_title') else ""
+                line = (f"    {status_display} {url_display} | 最终落地: {result['final_url']} "
+                        f"[{result['final_status']}]{final_title}")
+            elif result['redirect_url']:
+                line = f"    {status_display} {url_display} | 跳转到: {result['redirect_url']}"
+            else:
+                line = f"    {status_display} {url_display} | 重定向"
+        else:
+            line = f"    {status_display} {url_display} | {self.target_status_codes[status_code].split(' - ')[1]}"
+        if result.get('tech'):
+            line += f" [{result['tech']}]"
+        return line
+
+    def test_url(self, url: str) -> Tuple[bool, int, str, str, str, str, Dict]:
         """
         测试单个URL并提取标题和跳转信息
         
         Returns:
-            (是否成功, 状态码, URL, 标题, 跳转URL, 错误信息)
+            (是否成功, 状态码, URL, 标题, 跳转URL, 错误信息, 附加字段)
         """
         # 检查是否收到退出信号
         if self.exit_handler.exit_now:
-            return False, 0, url, "", "", "扫描已终止"
+            return False, 0, url, "", "", "扫描已终止", {}
+        
+        host_key = self.get_host_key(urlparse(url).hostname or url)
+        guard = None
+        if self.deadlines.enabled:
+            guard = self.deadlines.begin(host_key)
+            if guard is None:
+                return False, 0, url, "", "", "主机耗时超出预算", {}
         
+        # 单主机在途限制已在分发工作项时满足，这里只按单主机速率间隔发送，再受自适应并发控制器限制
+        self.scheduler.pace(host_key)
+        with self.limiter:
+            if guard is None:
+                return self._test_url(url)
+            return self.test_url_guarded(url, host_key, guard)
+
+    def test_url_guarded(self, url: str, host_key: str, guard) -> Tuple[bool, int, str, str, str, str, Dict]:
+        """
+        在截止时间内测试URL，到期时由看门狗关闭当前线程的连接打断阻塞中的读取
+        """
+        guard.arm()
+        token = None
+        if guard.deadline:
+            thread_id = threading.get_ident()
+            
+            def on_deadline():
+                guard.expire()
+                self.pool.abort_thread(thread_id)
+            
+            token = self.watchdog.watch(guard.deadline, on_deadline)
+            self.pool.set_deadline(guard.deadline)
         try:
-            response = self.session.get(
-                url,
+            return self._test_url(url, guard)
+        finally:
+            if token is not None:
+                self.watchdog.cancel(token)
+                self.pool.set_deadline(0)
+                # 请求出错时连接不会经过release，这里注销避免看门狗误关
+                self.pool.clear_thread()
+            self.deadlines.end(host_key, guard)
+
+    def _test_url(self, url: str, guard=None) -> Tuple[bool, int, str, str, str, str, Dict]:
+        host = urlparse(url).hostname
+        self.latency.begin_request()
+        headers_time = None
+        start_time = time.monotonic()
+        request_url, host_header = self.route_request(url)
+        try:
+            response = self.pool.get(
+                request_url,
+                headers={'Host': host_header} if host_header else None,
                 timeout=self.timeout,
                 verify=False,  # 忽略SSL证书验证
                 allow_redirects=False,  # 禁用自动跳转，以便获取跳转URL
                 stream=True  # 流式传输，避免下载大文件
             )
+            if guard is not None and guard.reason:
+                # 响应头还没读完连接就被看门狗关闭，得到的是残缺的响应
+                response.close()
+                raise ProbeAborted(guard.reason)
+            self.record_outcome(start_time, response.status_code)
+            # 首字节时间扣除本次请求新建连接的耗时
+            headers_time = time.monotonic()
+            self.latency.observe('ttfb', headers_time - start_time - self.latency.connection_time(), host)
             
-            # 检查是否为目标状态码
-            if response.status_code in self.target_status_codes:
-                # 提取跳转URL（如果存在）
-                redirect_url = ""
-                if response.status_code in [301, 302, 307, 308]:
-                    # 从响应头中获取跳转URL
-                    location = response.headers.get('Location', '')
-                    if location:
-                        # 处理相对路径的跳转
-                        if location.startswith('/'):
-                            redirect_url = urljoin(url, location)
-                        elif location.startswith(('http://', 'https://')):
-                            redirect_url = location
-                        else:
-                            redirect_url = urljoin(url, '/' + location.lstrip('/'))
-                
-                # 读取部分内容来提取标题（对于200状态码）
-                title = ""
-                if response.status_code == 200:
-                    content = b""
-                    content_length = 0
-                    max_content_length = 1024 * 1024  # 最多读取1MB
+            try:
+                # 检查是否为目标状态码
+                if response.status_code in self.target_status_codes:
+                    # 提取跳转URL（如果存在）
+                    redirect_url = self.get_redirect_url(url, response.status_code, response.headers)
                     
+                    # 读取正文前缀计算响应指纹，200响应同时边读边找标题
+                    analysis = ResponseAnalysis(self, url, response.status_code, response.headers)
+                    if guard is not None:
+                        guard.begin_body()
+                    try:
+                        for chunk in self.pool.iter_body(response):
+                            if analysis.feed(chunk) or (guard is not None and guard.feed(len(chunk))):
+                                break
+                    except Exception:
+                        # 看门狗在截止时间关闭了连接，保留已经读到的内容
+                        if guard is None or not guard.reason:
+                            raise
+                    title, extra = analysis.finish()
+                    if guard is not None and guard.reason:
+                        extra['aborted'] = guard.describe()
+                    self.latency.observe('body', time.monotonic() - headers_time, host)
+                else:
+                    return False, response.status_code, url, "", "", "", {}
+            finally:
+                # 归还连接，使同一源站的后续请求可以复用
+                self.pool.release(response)
+                self.latency.observe('total', time.monotonic() - start_time, host)
+            
+            # 归还连接后再沿跳转链继续请求
+            if redirect_url and self.redirects.enabled:
+                extra.update(self.follow_redirects(url, redirect_url))
+            return True, response.status_code, url, title, redirect_url, "", extra
+        
+        except Exception as e:
+            if guard is not None and guard.reason:
+                # 截止时间到达时看门狗关闭了连接，按中止处理而不是连接错误
+                e = ProbeAborted(guard.reason)
+            self.record_outcome(start_time, exc=e)
+            if isinstance(e, ProbeAborted):
+                error = guard.describe()
+            elif isinstance(e, requests.exceptions.Timeout):
+                error = "超时"
+            elif isinstance(e, requests.exceptions.ConnectionError):
+                error = "连接失败"
+            else:
+                error = "请求失败"
+            return False, 0, url, "", "", error, {}
+        finally:
+            if headers_time is None:
+                # 收到响应头之前失败（超时、连接被拒、握手失败、截止时间中止）的请求也计入总耗时
+                self.latency.observe('total', time.monotonic() - start_time, host)
+
+    def fetch_redirect_hop(self, url: str) -> Tuple[int, str, str]:
+        """
+        请求跳转链中的一跳
+
+        Returns:
+            (状态码, 跳转URL, 标题)，请求失败时状态码为0
+        """
+        try:
+            response = self.pool.get(url, timeout=self.timeout, verify=False,
+                                     allow_redirects=False, stream=True)
+        except Exception:
+            return 0, "", ""
+        try:
+            location = self.get_redirect_url(url, response.status_code, response.headers)
+            title = ""
+            if response.status_code == 200:
+                sniffer = self.create_title_sniffer(response.headers)
+                if sniffer.is_html:
                     for chunk in response.iter_content(chunk_size=8192):
-                        content += chunk
-                        content_length += len(chunk)
-                        if content_length >= max_content_length:
+                        if sniffer.feed(chunk):
                             break
-                    
-                    title = self.extract_title(content, response.headers)
-                
-                return True, response.status_code, url, title, redirect_url, ""
-            else:
-                return False, response.status_code, url, "", "", ""
-                
-        except requests.exceptions.Timeout:
-            return False, 0, url, "", "", "超时"
-        except requests.exceptions.ConnectionError:
-            return False, 0, url, "", "", "连接失败"
+                title = sniffer.get_title()
+            return response.status_code, location, title
         except Exception:
-            return False, 0, url, "", "", "请求失败"
+            return response.status_code, "", ""
+        finally:
+            self.pool.release(response)
+
+    def follow_redirects(self, url: str, location: str) -> Dict:
+        """
+        沿跳转链请求到最终落地页，已缓存的跳转不再发请求
+
+        Returns:
+            跳转链字段（redirect_chain, final_url, final_status, final_title）
+        """
+        chain = self.redirects.start(url, location)
+        while chain.next_url and not self.exit_handler.exit_now:
+            hop_url = chain.next_url
+            if not self.redirects.claim(hop_url):
+                # 同一跳已缓存或正由其他探测请求，等其结果
+                self.redirects.wait(hop_url, self.timeout)
+                if chain.advance():
+                    continue
+            chain.step(hop_url, *self.fetch_redirect_hop(hop_url))
+        return chain.finish()
+
+    def vhost_baseline_key(self, domain: str, port: int, protocol: str) -> Tuple[str, int, str]:
+        return self.get_host_key(domain), port, protocol
+
+    def vhost_baseline_url(self, key: Tuple[str, int, str]) -> str:
+        """
+        返回请求默认站点基线的URL，基线主机名登记为解析到该IP
+        """
+        ip, port, protocol = key
+        canary = self.vhosts.canary_host(ip)
+        self.domain_ips[canary] = [ip]
+        return self.build_url(canary, port, protocol)
+
+    def fetch_vhost_baseline(self, key: Tuple[str, int, str]) -> Dict:
+        """
+        获取(IP, 端口, 协议)默认站点的基线响应，同一基线只请求一次（线程引擎使用）
+        """
+        while True:
+            baseline = self.vhosts.lookup(key)
+            if baseline is not None:
+                return baseline
+            if self.vhosts.claim(key):
+                break
+            self.vhosts.wait(key, self.timeout)
+        return self.vhosts.store(key, self.test_url(self.vhost_baseline_url(key)))
+
+    def diff_vhost(self, key: Tuple[str, int, str], baseline: Dict,
+                   outcome: Tuple[bool, int, str, str, str, str, Dict]):
+        """
+        把虚拟主机响应与默认站点基线的差异写入结果的附加字段
+        """
+        _, status_code, _, title, _, _, extra = outcome
+        extra['vhost_ip'] = key[0]
+        extra['vhost_diff'] = self.vhosts.compare(baseline, status_code, extra.get('fingerprint'), title)
+
+    def classify_outcome(self, status_code: int = 0, exc: Exception = None) -> str:
+        """
+        将探测结果归类为自适应并发控制器使用的信号
+        
+        Returns:
+            'ok'、'timeout'、'reset'、'throttled'、'aborted' 或 'other'
+        """
+        if exc is None:
+            return 'throttled' if status_code in (429, 503) else 'ok'
+        if isinstance(exc, ProbeAborted):
+            # 被截止时间/速率保护中止的是个别慢主机，不视为整体拥塞
+            return 'aborted'
+        if isinstance(exc, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+            return 'timeout'
+        # 连接被拒绝是端口关闭的正常现象，只有连接被重置/中断才视为拥塞
+        text = repr(exc)
+        if 'reset' in text.lower() or 'Disconnected' in text or 'aborted' in text.lower():
+            return 'reset'
+        return 'other'
+
+    def record_outcome(self, start_time: float, status_code: int = 0, exc: Exception = None):
+        """
+        记录一次探测的延迟和结果类型
+        """
+        outcome = self.classify_outcome(status_code, exc)
+        self.limiter.record(time.monotonic() - start_time, outcome)
+        self.latency.count_outcome(outcome)
+
+    def complete_probe(self, domain: str, port: int, protocol: str,
+                       outcome: Tuple[bool, int, str, str, str, str, Dict]) -> Dict:
+        """
+        处理test_url的返回值：命中时构建并写出结果，并把完成的探测写入检查点日志
+        
+        Returns:
+            命中时返回结果字典，否则返回None
+        """
+        success, status_code, url, title, redirect_url, error, extra = outcome
+        if error == "扫描已终止":
+            # 被中断的探测不算完成，续扫时需要重新探测
+            return None
+        
+        result = None
+        if success:
+            result = self.build_result(domain, url, status_code, title, redirect_url, port, protocol)
+            self.store_body(result, extra)
+            result.update(extra)
+            self.record_hit(result)
+        origin = None
+        if self.path_probe is not None and status_code:
+            # 有HTTP响应的源站（包括不在关注列表中的状态码）进入敏感路径探测阶段
+            self.path_probe.add_origin(domain, port, protocol)
+            origin = protocol
+        if self.journal is not None:
+            # 记录源站协议，敏感路径探测未完成时续扫可以补做
+            self.journal.record(domain, port, result, origin)
+        return result
+
+    def store_body(self, result: Dict, extra: Dict):
+        """
+        把命中结果的正文交给正文存储，结果中只记录正文哈希
+        """
+        body = extra.pop('body', None)
+        if body is not None and self.body_store is not None:
+            result['body_hash'] = self.body_store.put(result['url'], result['status_code'], body)
+
+    def build_path_url(self, domain: str, port: int, protocol: str, path: str) -> str:
+        return self.build_url(domain, port, protocol) + path
+
+    def complete_path_probe(self, domain: str, port: int, protocol: str, path: str,
+                            outcome: Tuple[bool, int, str, str, str, str, Dict]) -> Dict:
+        """
+        处理敏感路径探测的返回值：与源站基线不同的命中才写出结果
+
+        Returns:
+            命中时返回结果字典，否则返回None
+        """
+        success, status_code, url, title, redirect_url, error, extra = outcome
+        if error == "扫描已终止" or not self.path_probe.is_interesting((domain, port, protocol), outcome):
+            return None
+        result = self.build_result(domain, url, status_code, title, redirect_url, port, protocol)
+        result['path'] = path
+        self.store_body(result, extra)
+        result.update(extra)
+        self.record_hit(result)
+        if self.journal is not None:
+            # 只记录命中，续扫时恢复结果
+            self.journal.record(domain, port, result)
+        return result
+
+    def record_hit(self, result: Dict):
+        """
+        把命中结果交给流式写入器，并累加状态码计数
+        """
+        with self._hit_lock:
+            status_code = result['status_code']
+            self.hit_counts[status_code] = self.hit_counts.get(status_code, 0) + 1
+        # 加入响应聚类
+        self.fingerprints.add(result.get('fingerprint'), result['url'])
+        if self.tech is not None and result.get('tech'):
+            self.tech.count(result['tech'])
+        self.sink.write(result)
+
+    def should_display(self, result: Dict) -> bool:
+        """
+        判断结果是否需要在控制台逐条显示，同一响应簇超过阈值后不再显示
+        """
+        if result.get('vhost_diff') == VhostBaseline.SAME:
+            # 与该IP默认站点相同的虚拟主机只写入结果文件
+            return False
+        fingerprint = result.get('fingerprint')
+        display = self.fingerprints.claim_display(fingerprint)
+        if display == 0:
+            print(f"[*] 响应指纹 {fingerprint} 出现超过 {self.fingerprints.cluster_threshold} 次 "
+                  f"(如 {result['url']})，后续相同响应不再逐条显示")
+        return display > 0
+
+    def open_journal(self, input_file: str):
+        """
+        打开检查点日志，续扫时加载已完成的探测
+        """
+        journal_file = self.journal_file or f"{input_file}.journal"
+        if self.shard is not None:
+            # 每个分片使用独立的日志，续扫时需要相同的进程数
+            journal_file = f"{journal_file}.shard{self.shard[0]}-{self.shard[1]}"
+        self.journal = ScanJournal(journal_file, resume=self.resume)
+        print(f"[*] 检查点日志: {journal_file}")
+        if self.resume:
+            print(f"[*] 断点续扫: 已完成 {len(self.journal.completed)} 个探测, "
+                  f"恢复 {len(self.journal.results)} 条结果")
+
+    def iter_domains(self, f) -> Iterator[str]:
+        """
+        流式读取输入文件中的域名，续扫时跳过所有端口都已完成的域名
+        """
+        for line in f:
+            domain = line.strip()
+            if not domain:
+                continue
+            if self.shard is not None and ShardWorker.shard_of(self.normalize_domain(domain), self.shard[1]) != self.shard[0]:
+                continue
+            self.domain_count += 1
+            # 只看检查点日志，端口预探测的结果属于上一批次，不能用来过滤
+            normalized = self.normalize_domain(domain)
+            if self.resume and all(self.journal.is_done(normalized, port) for port, _ in self.ports):
+                continue
+            yield domain
+
+    def iter_batches(self, domains: Iterable[str]) -> Iterator[List[str]]:
+        """
+        将域名流切分为固定大小的批次，供需要整批处理的DNS解析/端口预探测阶段使用
+        """
+        domains = iter(domains)
+        while not self.exit_handler.exit_now:
+            batch = list(islice(domains, self.batch_size))
+            if not batch:
+                break
+            yield batch
 
     def scan_domain(self, domain: str) -> List[Dict]:
         """
@@ -237,69 +874,79 @@ class HttpScanner:
         
         domain_printed = False
         
-        for port, protocol in self.common_ports:
+        for port, protocol in self.get_ports(domain):
             # 检查是否收到退出信号
             if self.exit_handler.exit_now:
                 break
                 
             # 构建URL
-            if protocol == 'https':
-                url = f"https://{domain}:{port}"
-            else:
-                url = f"http://{domain}:{port}"
+            url = self.build_url(domain, port, protocol)
             
-            success, status_code, test_url, title, redirect_url, error = self.test_url(url)
+            outcome = self.test_url(url)
+            if self.vhosts is not None and outcome[0]:
+                key = self.vhost_baseline_key(domain, port, protocol)
+                self.diff_vhost(key, self.fetch_vhost_baseline(key), outcome)
+            result = self.complete_probe(domain, port, protocol, outcome)
             
-            if success:
-                result = {
-                    'domain': domain,
-                    'url': test_url,
-                    'status_code': status_code,
-                    'title': title,
-                    'redirect_url': redirect_url,
-                    'port': port,
-                    'protocol': protocol,
-                    'description': self.target_status_codes[status_code]
-                }
+            if result:
                 results.append(result)
-                
-                # 一行显示结果
-                status_color = self.get_status_color(status_code)
-                reset_color = "\033[0m"
+                if not self.should_display(result):
+                    continue
                 
                 # 格式化显示：在一行内显示完整信息
                 if not domain_printed:
                     print(f"[+] 域名: {domain}")
                     domain_printed = True
-                
-                # 根据状态码构建显示信息
-                status_display = f"{status_color}[{status_code}]{reset_color}"
-                url_display = test_url.ljust(45)
-                
-                # 对于不同状态码，显示不同信息
-                if status_code == 200:
-                    display_title = title if title else "无标题"
-                    print(f"    {status_display} {url_display} | {display_title}")
-                elif status_code in [301, 302, 307, 308]:
-                    if redirect_url:
-                        print(f"    {status_display} {url_display} | 跳转到: {redirect_url}")
-                    else:
-                        print(f"    {status_display} {url_display} | 重定向")
-                else:
-                    print(f"    {status_display} {url_display} | {self.target_status_codes[status_code].split(' - ')[1]}")
+                print(self.format_result(result))
         
         return results
 
-    def scan_from_file(self, input_file: str) -> Dict[int, List[Dict]]:
+    def fetch_path_baseline(self, origin: Tuple[str, int, str]):
+        """
+        请求源站的随机路径作为敏感路径探测的基线
+        """
+        url = self.build_path_url(*origin, PathProbe.random_path())
+        self.path_probe.store_baseline(origin, self.test_url(url))
+
+    def probe_path(self, unit: Tuple[str, int, str, str]):
+        """
+        探测源站上的一个敏感路径，命中时打印结果
+        """
+        outcome = self.test_url(self.build_path_url(*unit))
+        result = self.complete_path_probe(*unit, outcome)
+        if result and self.should_display(result):
+            print(self.format_result(result))
+
+    def scan_paths(self):
+        """
+        对本批次发现的存活源站执行敏感路径探测：先请求每个源站的随机路径基线，再请求字典中的路径
+        """
+        origins = self.path_probe.take_origins()
+        if not origins:
+            return
+        print(f"[*] 敏感路径探测: {len(origins)} 个源站 x {len(self.path_probe.paths)} 个路径")
+        start_time = time.time()
+        if self.engine == 'async':
+            self.run_async(lambda engine: engine.scan_paths(origins))
+        else:
+            key_func = lambda unit: self.get_host_key(unit[0])
+            self.run_threaded(origins, self.fetch_path_baseline, key_func)
+            if not self.exit_handler.exit_now:
+                self.run_threaded(self.path_probe.iter_units(origins), self.probe_path, key_func)
+        self.path_probe.finish_batch()
+        if self.journal is not None and not self.exit_handler.exit_now:
+            self.journal.record_paths_done(origins)
+        print(f"[*] 敏感路径探测完成, 耗时 {time.time() - start_time:.1f}s")
+
+    def scan_from_file(self, input_file: str, results_file: str) -> Dict[int, int]:
         """
-        从文件读取域名并扫描
+        从文件读取域名并扫描，命中结果实时写入results_file
         
         Returns:
-            按状态码分类的结果字典
+            各状态码的命中数量
         """
         try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                domains = [line.strip() for line in f if line.strip()]
+            f = open(input_file, 'r', encoding='utf-8')
         except FileNotFoundError:
             print(f"错误: 文件 '{input_file}' 不存在！")
             sys.exit(1)
@@ -307,102 +954,343 @@ class HttpScanner:
             print(f"读取文件时出错: {str(e)}")
             sys.exit(1)
         
-        if not domains:
-            print("警告: 输入文件为空！")
-            return {}
-        
-        print(f"[*] 读取到 {len(domains)} 个域名")
+        print(f"[*] 流式读取域名文件: {input_file}")
         print(f"[*] 开始扫描... (重点关注状态码: {', '.join(map(str, sorted(self.target_status_codes.keys())))})")
         print("[!] 按 Ctrl+C 可随时终止扫描")
         print("="*80)
         
-        all_results = []
+        self.domain_count = 0
+        self.hit_counts = {}
+        self.sink = ResultSink(results_file, self.results_format)
+        print(f"[*] 实时结果文件: {results_file}")
+        try:
+            if self.processes > 1:
+                # 各子进程自行读取输入文件中属于自己的分片
+                f.close()
+                self.scan_sharded(input_file)
+            else:
+                with f:
+                    self.scan_stream(input_file, f)
+        finally:
+            self.sink.close()
+        
+        if self.domain_count == 0:
+            print("警告: 输入文件为空！")
+            return {}
+        print(f"[*] 共读取 {self.domain_count} 个域名")
         
+        return self.hit_counts
+
+    def open_body_store(self):
+        """
+        打开正文存储的索引文件，多进程扫描时每个分片使用独立的索引
+        """
+        index_name = 'index.jsonl'
+        if self.shard is not None:
+            index_name = f"index.shard{self.shard[0]}-{self.shard[1]}.jsonl"
+        self.body_store.open(index_name, resume=self.resume)
+        print(f"[*] 响应正文存储: {self.body_store.index_path}")
+
+    def scan_stream(self, input_file: str, f):
+        """
+        打开检查点日志并扫描输入流中的所有域名，命中结果写入self.sink
+        """
+        self.open_journal(input_file)
+        if self.body_store is not None:
+            self.open_body_store()
         try:
-            # 使用线程池并发扫描
+            # 续扫时先把之前的命中结果写入结果文件
+            for result in self.journal.results:
+                self.record_hit(result)
+            self.journal.results = []
+            if self.path_probe is not None:
+                self.resume_paths()
+            
+            domains = self.iter_domains(f)
+            if self.dns_resolver or self.port_probe or self.path_probe is not None:
+                # DNS解析和端口预探测需要整批处理，敏感路径探测需要每批结束时取出本批源站，
+                # 按批次推进以保持内存占用稳定
+                for batch in self.iter_batches(domains):
+                    self.scan_domains(batch)
+            else:
+                self.scan_domains(domains)
+        finally:
+            self.journal.close()
+            if self.body_store is not None:
+                self.body_store.close()
+
+    def resume_paths(self):
+        """
+        续扫时补做上次根路径已探测、敏感路径探测未完成的源站，已命中的路径不再重复探测
+        """
+        origins, self.journal.origins = self.journal.origins, {}
+        if not origins or self.exit_handler.exit_now:
+            return
+        for (domain, port), protocol in origins.items():
+            self.path_probe.add_origin(domain, port, protocol)
+        self.path_probe.done, self.journal.path_hits = self.journal.path_hits, set()
+        print(f"[*] 断点续扫: 补做 {len(origins)} 个源站的敏感路径探测")
+        self.scan_paths()
+        self.path_probe.done = set()
+
+    def scan_sharded(self, input_file: str):
+        """
+        多进程分片扫描：每个子进程扫描一个分片，父进程汇总命中结果和统计信息
+        """
+        print(f"[*] 多进程分片扫描: {self.processes} 个进程")
+        # spawn在各平台行为一致，子进程不继承父进程的线程和连接
+        context = multiprocessing.get_context('spawn')
+        result_queue = context.Queue(maxsize=10000)
+        workers = [context.Process(target=ShardWorker.run, name=f"HttpScanner-{shard}",
+                                   args=(self.init_args, input_file, shard, self.processes, result_queue))
+                   for shard in range(self.processes)]
+        for worker in workers:
+            worker.start()
+        
+        running = len(workers)
+        while running:
+            try:
+                message = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    print("[!] 扫描进程异常退出")
+                    break
+                continue
+            except KeyboardInterrupt:
+                # 子进程同样收到中断信号，继续收集它们已经发出的结果
+                self.exit_handler.exit_now = True
+                continue
+            
+            if message[0] == 'hit':
+                self.record_hit(message[1])
+            elif message[0] == 'done':
+                running -= 1
+                self.merge_worker_stats(message[2])
+        
+        for worker in workers:
+            worker.join()
+
+    def worker_stats(self) -> Dict:
+        """
+        分片子进程结束时发回父进程的统计信息
+        """
+        return {
+            'domain_count': self.domain_count,
+            'pool': self.pool_stats,
+            'limiter': self.limiter.stats(),
+            'redirects': self.redirects.stats(),
+            'latency': self.latency.to_dict(),
+            'deadlines': self.deadlines.stats(),
+            'vhosts': self.vhosts.stats() if self.vhosts is not None else None,
+            'paths': self.path_probe.stats() if self.path_probe is not None else None,
+            'body_store': self.body_store.stats() if self.body_store is not None else None,
+        }
+
+    def merge_worker_stats(self, stats: Dict):
+        """
+        父进程汇总一个分片的统计信息
+        """
+        self.domain_count += stats['domain_count']
+        for key, value in stats['pool'].items():
+            self.pool_stats[key] = self.pool_stats.get(key, 0) + value
+        self.redirects.merge(stats['redirects'])
+        self.latency.merge(stats['latency'])
+        self.deadlines.merge(stats['deadlines'])
+        if self.vhosts is not None:
+            self.vhosts.merge(stats['vhosts'])
+        if self.path_probe is not None:
+            self.path_probe.merge(stats['paths'])
+        if self.body_store is not None:
+            self.body_store.merge(stats['body_store'])
+        self.shard_stats.append(stats['limiter'])
+
+    def scan_domains(self, domains: Iterable[str]):
+        """
+        依次执行DNS解析、端口预探测和HTTP探测阶段
+        """
+        if self.dns_resolver:
+            domains = self.resolve_domains(domains)
+            if self.exit_handler.exit_now or not domains:
+                return
+            if self.vhosts is not None:
+                # 同一IP上的域名相邻探测，到该IP的连接在连接池中保持可复用
+                domains = sorted(domains, key=self.get_host_key)
+        
+        if self.port_probe:
+            self.preprobe_ports(domains)
+            if self.exit_handler.exit_now:
+                return
+        
+        if self.engine == 'async':
+            self.scan_async(domains)
+        else:
+            self.scan_threaded(domains)
+        
+        if self.path_probe is not None and not self.exit_handler.exit_now:
+            self.scan_paths()
+
+    def scan_async(self, domains: Iterable[str]):
+        """
+        使用asyncio引擎扫描，每个(域名, 端口)作为独立任务调度
+        """
+        self.run_async(lambda engine: engine.scan(domains))
+
+    def run_async(self, start: Callable):
+        """
+        创建异步引擎并运行start(engine)返回的协程
+        """
+        engine = AsyncHttpEngine(self, pool_size=self.pool_size)
+        try:
+            asyncio.run(start(engine))
+        except KeyboardInterrupt:
+            print("\n[!] 用户中断，正在停止扫描...")
+            self.exit_handler.exit_now = True
+        finally:
+            # 分批扫描时每批使用独立的引擎，统计需要累加
+            for key, value in engine.pool_stats().items():
+                self.pool_stats[key] = self.pool_stats.get(key, 0) + value
+
+    def scan_threaded(self, domains: Iterable[str]):
+        """
+        使用线程池扫描，每个域名作为一个任务
+        """
+        self.run_threaded(domains, self.scan_domain, self.get_host_key)
+
+    def run_admitted(self, task: Callable, item, key):
+        """
+        执行调度器已放行的工作项，结束后释放该主机的在途名额
+        """
+        self.scheduler.grant(key)
+        try:
+            return task(item)
+        finally:
+            self.scheduler.grant(None)
+            if key is not None:
+                self.scheduler.release(key)
+
+    def run_threaded(self, items: Iterable, task: Callable, key_func: Callable):
+        """
+        使用线程池对每一项执行task，同一主机/IP上的项交错提交；
+        主机达到速率或在途限制时暂存它的项，不占用工作线程
+        """
+        try:
+            # 使用线程池并发扫描，在途任务数有上限，读取速度受扫描速度反压
             with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_domain = {}
+                future_to_item = {}
+                max_pending = self.max_workers * 2
+                
+                def collect(done_futures):
+                    for future in done_futures:
+                        item = future_to_item.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            if not self.exit_handler.exit_now:
+                                print(f"[!] 扫描 {item} 出错: {str(e)}")
                 
-                # 提交所有任务
-                for domain in domains:
+                # 边读取边提交任务，同一主机/IP上的项交错提交，主机放行后才提交
+                interleaved = self.scheduler.interleave(items, key_func)
+                for item, key in self.scheduler.dispatch(interleaved, key_func):
+                    if item is None:
+                        # 暂无可放行的主机，等待有任务完成或主机到达发送时间
+                        if future_to_item:
+                            done, _ = concurrent.futures.wait(
+                                future_to_item, timeout=key, return_when=concurrent.futures.FIRST_COMPLETED
+                            )
+                            collect(done)
+                        else:
+                            time.sleep(key)
+                        if not self.exit_handler.exit_now:
+                            continue
+                    
                     # 检查是否收到退出信号
                     if self.exit_handler.exit_now:
+                        if item is not None and key is not None:
+                            self.scheduler.release(key)
                         print("\n[!] 正在终止任务提交...")
                         break
                     
-                    future = executor.submit(self.scan_domain, domain)
-                    future_to_domain[future] = domain
+                    while len(future_to_item) >= max_pending and not self.exit_handler.exit_now:
+                        done, _ = concurrent.futures.wait(
+                            future_to_item, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                        collect(done)
+                    
+                    future = executor.submit(self.run_admitted, task, item, key)
+                    future_to_item[future] = item
                 
-                # 处理完成的任务
-                for future in concurrent.futures.as_completed(future_to_domain):
+                # 处理剩余的任务
+                while future_to_item:
                     # 检查是否收到退出信号
                     if self.exit_handler.exit_now:
                         print("\n[!] 正在终止扫描...")
                         executor.shutdown(wait=False, cancel_futures=True)
                         break
                     
-                    domain = future_to_domain[future]
-                    try:
-                        results = future.result(timeout=self.timeout * 2)
-                        if results:
-                            all_results.extend(results)
-                    except concurrent.futures.TimeoutError:
-                        print(f"[!] 扫描 {domain} 超时")
-                    except Exception as e:
-                        if not self.exit_handler.exit_now:
-                            print(f"[!] 扫描 {domain} 出错: {str(e)}")
+                    done, _ = concurrent.futures.wait(
+                        future_to_item, timeout=1, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    collect(done)
         
         except KeyboardInterrupt:
             print("\n[!] 用户中断，正在停止扫描...")
             self.exit_handler.exit_now = True
         
-        # 按状态码分类结果
-        classified_results = {}
-        for result in all_results:
-            status = result['status_code']
-            if status not in classified_results:
-                classified_results[status] = []
-            classified_results[status].append(result)
-        
-        return classified_results
+        self.pool_stats = self.pool.stats()
 
-    def save_results(self, results: Dict[int, List[Dict]], output_file: str):
+    def save_results(self, results_file: str, hit_counts: Dict[int, int], output_file: str):
         """
-        保存所有结果到一个文件，按状态码分类
+        从流式结果文件生成按状态码分类的报告
+        每个状态码顺序读取一遍结果文件，内存中不保留结果列表
         
         Args:
-            results: 按状态码分类的结果字典
+            results_file: 流式结果文件
+            hit_counts: 各状态码的命中数量
             output_file: 输出文件名
         """
-        if not results:
+        if not hit_counts:
             print("[!] 没有结果需要保存")
             return
         
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # 按状态码顺序写入结果
+        status_order = [200, 401, 403, 500, 503, 429, 400, 301, 302, 307, 308]
+        total_count = sum(hit_counts.get(status_code, 0) for status_code in status_order)
+        
+        # 同时生成一个简化的URL列表文件
+        url_file = "urls_list.txt"
+        with open(output_file, 'w', encoding='utf-8') as f, open(url_file, 'w', encoding='utf-8') as url_f:
             # 写入文件头
             f.write("="*80 + "\n")
             f.write(f"HTTP扫描结果 - {timestamp}\n")
             f.write(f"扫描目标状态码: {', '.join(map(str, sorted(self.target_status_codes.keys())))}\n")
             f.write("="*80 + "\n\n")
             
-            # 按状态码顺序写入结果
-            status_order = [200, 401, 403, 500, 503, 429, 400, 301, 302, 307, 308]
-            
-            total_count = 0
             for status_code in status_order:
-                if status_code in results:
-                    result_list = results[status_code]
-                    count = len(result_list)
-                    total_count += count
+                if status_code in hit_counts:
+                    count = hit_counts[status_code]
                     
                     f.write(f"\n{'='*60}\n")
                     f.write(f"状态码 {status_code}: {self.target_status_codes[status_code]}\n")
                     f.write(f"发现数量: {count}\n")
                     f.write(f"{'='*60}\n\n")
                     
-                    for result in result_list:
+                    collapsed_written = set()
+                    for result in ResultSink.iter_results(results_file, self.results_format):
+                        if result['status_code'] != status_code:
+                            continue
+                        url_f.write(f"{result['url']}\n")
+                        
+                        # 同簇的大量重复响应只写一条代表结果
+                        fingerprint = result.get('fingerprint')
+                        if fingerprint and self.fingerprints.is_collapsed(fingerprint):
+                            if fingerprint in collapsed_written:
+                                continue
+                            collapsed_written.add(fingerprint)
+                            f.write(f"[相同响应 {self.fingerprints.get_count(fingerprint)} 个，已折叠，"
+                                    f"指纹 {fingerprint}，完整列表见结果文件]\n")
+                        
                         if status_code == 200:
                             f.write(f"URL: {result['url']}\n")
                             f.write(f"标题: {result['title']}\n")
@@ -411,10 +1299,20 @@ class HttpScanner:
                             f.write(f"URL: {result['url']}\n")
                             if result['redirect_url']:
                                 f.write(f"跳转到: {result['redirect_url']}\n")
+                            if result.get('redirect_chain'):
+                                f.write(f"跳转链: {result['redirect_chain']}\n")
+                                f.write(f"最终落地: {result['final_url']} [{result['final_status']}] "
+                                        f"{result.get('final_title', '')}\n")
                             f.write(f"端口: {result['port']} ({result['protocol']})\n")
                         else:
                             f.write(f"URL: {result['url']}\n")
                             f.write(f"端口: {result['port']} ({result['protocol']})\n")
+                        if result.get('tech'):
+                            f.write(f"技术栈: {result['tech']}\n")
+                        if result.get('vhost_diff'):
+                            f.write(f"虚拟主机: {result['vhost_ip']} ({result['vhost_diff']})\n")
+                        if result.get('aborted'):
+                            f.write(f"读取中止: {result['aborted']}\n")
                         f.write("-"*60 + "\n")
             
             # 写入统计信息
@@ -425,28 +1323,181 @@ class HttpScanner:
             f.write(f"总共发现: {total_count} 个有效响应\n\n")
             
             for status_code in status_order:
-                if status_code in results:
-                    count = len(results[status_code])
+                if status_code in hit_counts:
+                    count = hit_counts[status_code]
                     percentage = (count / total_count * 100) if total_count > 0 else 0
                     f.write(f"状态码 {status_code}: {count} 个 ({percentage:.1f}%)\n")
+            
+            top_clusters = self.fingerprints.top_clusters()
+            if top_clusters:
+                f.write("\n最大的响应簇:\n")
+                for fingerprint, cluster in top_clusters:
+                    f.write(f"  {fingerprint}: {cluster['count']} 个 (如 {cluster['url']})\n")
         
         print(f"[*] 所有结果已保存到: {output_file}")
-        
-        # 同时生成一个简化的URL列表文件
-        url_file = "urls_list.txt"
-        with open(url_file, 'w', encoding='utf-8') as f:
-            for status_code in status_order:
-                if status_code in results:
-                    for result in results[status_code]:
-                        f.write(f"{result['url']}\n")
-        
         print(f"[*] URL列表已保存到: {url_file}")
         
         return total_count
 
-    def run(self,input_file: str, output_file: str = "http_scanner_results.txt", timeout: int = 5, max_workers: int = 10):
+    def print_pool_stats(self):
+        """
+        输出连接池复用统计
+        """
+        stats = self.pool_stats
+        if not stats or not stats.get('requests'):
+            return
+        hit_rate = stats['hits'] / stats['requests'] * 100
+        print(f"\n连接池: 请求 {stats['requests']} 次, 复用连接 {stats['hits']} 次, "
+              f"新建连接 {stats['misses']} 次 (命中率 {hit_rate:.1f}%)")
+
+    def print_redirect_stats(self):
+        """
+        输出跳转链解析统计
+        """
+        if not self.redirects.enabled:
+            return
+        stats = self.redirects.stats()
+        if not stats['requests'] and not stats['cache_hits']:
+            return
+        print(f"\n跳转链: 请求 {stats['requests']} 跳, 缓存命中 {stats['cache_hits']} 次, "
+              f"不同落地页 {stats['final_urls']} 个")
+
+    def print_vhost_stats(self):
+        """
+        输出虚拟主机基线比较统计
+        """
+        if self.vhosts is None:
+            return
+        stats = self.vhosts.stats()
+        if not stats['baselines']:
+            return
+        print(f"\n虚拟主机: 默认站点基线 {stats['baselines']} 个, 独有内容 {stats['differs']} 个, "
+              f"与默认站点相同 {stats['same']} 个 (只写入结果文件)")
+
+    def print_body_store_stats(self):
+        """
+        输出正文存储统计
+        """
+        if self.body_store is None:
+            return
+        stats = self.body_store.stats()
+        if not stats['stored'] and not stats['deduplicated']:
+            return
+        print(f"\n正文存储: 新增对象 {stats['stored']} 个, 重复内容 {stats['deduplicated']} 个, "
+              f"原始 {stats['raw_bytes'] / 1024:.1f} KB, 压缩后写入 {stats['compressed_bytes'] / 1024:.1f} KB "
+              f"({self.body_store.directory})")
+
+    def print_tech_stats(self):
+        """
+        输出命中结果中最常见的技术
+        """
+        if self.tech is None:
+            return
+        top = self.tech.top()
+        if not top:
+            return
+        print(f"\n技术栈 (特征 {self.tech.signature_count} 条): " + ", ".join(f"{name} {count}" for name, count in top))
+
+    def print_path_stats(self):
+        """
+        输出敏感路径探测统计
+        """
+        if self.path_probe is None:
+            return
+        stats = self.path_probe.stats()
+        if not stats['requests']:
+            return
+        print(f"\n敏感路径: 请求 {stats['requests']} 次, 命中 {stats['hits']} 个, "
+              f"与源站基线相同被丢弃 {stats['dropped']} 个")
+
+    def print_cluster_stats(self):
+        """
+        输出响应聚类统计
+        """
+        collapsed = self.fingerprints.top_clusters(limit=len(self.fingerprints.clusters))
+        if not collapsed:
+            return
+        collapsed_count = sum(cluster['count'] for _, cluster in collapsed)
+        print(f"\n响应聚类: {len(collapsed)} 个簇被折叠, 共 {collapsed_count} 个重复响应")
+
+    def print_limiter_stats(self):
+        """
+        输出自适应并发控制统计
+        """
+        if self.shard_stats:
+            # 多进程扫描时各进程独立调整，输出合计值
+            stats = {key: sum(shard[key] for shard in self.shard_stats)
+                     for key in ('limit', 'peak', 'increase', 'decrease')}
+            print(f"自适应并发({len(self.shard_stats)} 个进程合计): 最终 {stats['limit']}, "
+                  f"峰值 {stats['peak']}, 增加 {stats['increase']} 次, 回退 {stats['decrease']} 次")
+            return
+        stats = self.limiter.stats()
+        print(f"自适应并发: 范围 [{self.min_workers}, {self.max_workers}], 最终 {stats['limit']}, "
+              f"峰值 {stats['peak']}, 增加 {stats['increase']} 次, 回退 {stats['decrease']} 次")
+
+    def print_deadline_stats(self):
+        """
+        输出截止时间和慢速读取保护统计
+        """
+        stats = self.deadlines.stats()
+        if not any(stats.values()):
+            return
+        print(f"截止时间保护: 超时中止 {stats['deadline']} 次, 低速中止 {stats['slow']} 次, "
+              f"主机预算耗尽跳过 {stats['skipped']} 个探测")
+
+    def print_latency_stats(self):
+        """
+        输出分阶段延迟统计，并按需写出Prometheus格式的指标文件
+        """
+        rows = self.latency.summary()
+        if rows:
+            print("\n分阶段延迟 (秒):")
+            print(f"  {'阶段':<8} {'次数':>8} {'平均':>8} {'P50':>8} {'P95':>8} {'最大':>8}")
+            for phase, count, average, p50, p95, maximum in rows:
+                print(f"  {LatencyStats.PHASE_NAMES[phase]:<8} {count:>8} {average:>8.3f} "
+                      f"{p50:>8.3f} {p95:>8.3f} {maximum:>8.3f}")
+            if self.engine == 'async':
+                print("  (异步引擎的TCP连接耗时包含TLS握手)")
+            
+            slowest = self.latency.slowest_hosts(5)
+            if slowest:
+                print("最慢的主机 (平均耗时):")
+                for host, total, phases in slowest:
+                    detail = ", ".join(f"{LatencyStats.PHASE_NAMES[phase]} {phases[phase]:.3f}"
+                                       for phase in LatencyStats.PHASES if phase in phases and phase != 'total')
+                    print(f"  {host}: {total:.3f}s ({detail})")
+        
+        if self.latency.outcomes:
+            outcomes = ", ".join(f"{outcome} {count}" for outcome, count in sorted(self.latency.outcomes.items()))
+            print(f"探测结果分类: {outcomes}")
+        
+        if self.metrics_file:
+            with open(self.metrics_file, 'w', encoding='utf-8') as f:
+                f.write(self.latency.to_prometheus())
+            print(f"[*] 延迟指标已保存到: {self.metrics_file}")
+
+    def run(self,input_file: str, output_file: str = "http_scanner_results.txt", timeout: int = None,
+            max_workers: int = None, min_workers: int = None, results_file: str = None):
+        # 传入的参数覆盖构造函数中的设置
+        if timeout is not None:
+            self.timeout = timeout
+            self.init_args['timeout'] = timeout
+            if self.deadline_auto:
+                self.deadlines.probe_deadline = timeout * 3
+        if max_workers is not None or min_workers is not None:
+            self.init_args.update(max_workers=max_workers or self.max_workers,
+                                  min_workers=min_workers or self.min_workers)
+            self.set_worker_limits(min_workers or self.min_workers, max_workers or self.max_workers)
+            if not self.pool_size:
+                self.pool = HttpClientPool(self.headers, pool_maxsize=self.max_workers, latency=self.latency)
+        
+        # 实时结果文件默认与报告同名，扩展名为结果格式
+        if not results_file:
+            results_file = f"{os.path.splitext(output_file)[0]}.{self.results_format}"
+            if os.path.abspath(results_file) == os.path.abspath(output_file):
+                results_file = f"{output_file}.results.{self.results_format}"
         try:
-            results = self.scan_from_file(input_file)
+            results = self.scan_from_file(input_file, results_file)
         except KeyboardInterrupt:
             print("\n[!] 扫描被用户终止")
             sys.exit(0)
@@ -459,16 +1510,27 @@ class HttpScanner:
         print("="*80)
         
         if results:
-            total_count = self.save_results(results, output_file)
+            total_count = self.save_results(results_file, results, output_file)
             
             print(f"\n扫描结果总结:")
             status_order = [200, 401, 403, 500, 503, 429, 400, 301, 302, 307, 308]
             for status_code in status_order:
                 if status_code in results:
-                    count = len(results[status_code])
+                    count = results[status_code]
                     description = self.target_status_codes[status_code].split(' - ')[1]
                     print(f"  {status_code}: {count} 个 ({description})")
             
             print(f"\n总共发现 {total_count} 个有效响应")
         else:
-            print("未发现任何目标状态码的响应")
\ No newline at end of file
+            print("未发现任何目标状态码的响应")
+        
+        self.print_cluster_stats()
+        self.print_vhost_stats()
+        self.print_path_stats()
+        self.print_tech_stats()
+        self.print_body_store_stats()
+        self.print_redirect_stats()
+        self.print_pool_stats()
+        self.print_limiter_stats()
+        self.print_deadline_stats()
+        self.print_latency_stats()
\ No newline at end of file
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+分阶段延迟统计
+按请求阶段（DNS解析、TCP连接、TLS握手、首字节、正文读取、总耗时）累计直方图，
+同时维护按主机的耗时汇总和探测结果计数，可导出为Prometheus文本格式，
+用于根据实际数据调整超时时间和并发数
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+
+class LatencyStats:
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body', 'total')
+    # 直方图桶上界（秒），与Prometheus客户端默认桶一致
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    PHASE_NAMES = {
+        'dns': 'DNS解析',
+        'connect': 'TCP连接',
+        'tls': 'TLS握手',
+        'ttfb': '首字节',
+        'body': '正文读取',
+        'total': '总耗时',
+    }
+
+    def __init__(self, max_hosts: int = 10000):
+        """
+        初始化延迟统计
+
+        Args:
+            max_hosts: 保留按主机汇总的最大主机数，超出后淘汰最久未更新的主机
+        """
+        self.max_hosts = max_hosts
+        # 阶段 -> 各桶计数（最后一个为+Inf桶）、总和、最大值
+        self.counts = {phase: [0] * (len(self.BUCKETS) + 1) for phase in self.PHASES}
+        self.sums = {phase: 0.0 for phase in self.PHASES}
+        self.maxima = {phase: 0.0 for phase in self.PHASES}
+        # 主机 -> {阶段: [次数, 总和]}
+        self.hosts: 'OrderedDict[str, Dict[str, List[float]]]' = OrderedDict()
+        self.outcomes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # 线程引擎中当前请求新建连接所花的时间，用于从首字节时间中扣除
+        self._local = threading.local()
+
+    def observe(self, phase: str, seconds: float, host: str = None):
+        """
+        记录一个阶段的耗时
+        """
+        seconds = max(0.0, seconds)
+        index = len(self.BUCKETS)
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[phase][index] += 1
+            self.sums[phase] += seconds
+            if seconds > self.maxima[phase]:
+                self.maxima[phase] = seconds
+            if host:
+                summary = self.hosts.get(host)
+                if summary is None:
+                    summary = self.hosts[host] = {}
+                    if len(self.hosts) > self.max_hosts:
+                        self.hosts.popitem(last=False)
+                else:
+                    self.hosts.move_to_end(host)
+                entry = summary.setdefault(phase, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+    def count_outcome(self, outcome: str):
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def begin_request(self):
+        """
+        线程引擎开始一个请求前调用，清零当前线程的建连耗时
+        """
+        self._local.connection_time = 0.0
+
+    def observe_connection(self, phase: str, seconds: float, host: str = None):
+        """
+        记录建连阶段（dns/connect/tls）的耗时，并计入当前线程请求的建连耗时
+        """
+        self.observe(phase, seconds, host)
+        self._local.connection_time = getattr(self._local, 'connection_time', 0.0) + seconds
+
+    def connection_time(self) -> float:
+        return getattr(self._local, 'connection_time', 0.0)
+
+    def quantile(self, phase: str, q: float) -> float:
+        """
+        根据直方图估算分位数（桶内线性插值）
+        """
+        counts = self.counts[phase]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(counts):
+            upper = min(self.BUCKETS[i], self.maxima[phase]) if i < len(self.BUCKETS) else self.maxima[phase]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.maxima[phase]
+
+    def summary(self) -> List[Tuple[str, int, float, float, float, float]]:
+        """
+        Returns:
+            [(阶段, 次数, 平均, P50, P95, 最大), ...]，只包含有数据的阶段
+        """
+        rows = []
+        with self._lock:
+            for phase in self.PHASES:
+                total = sum(self.counts[phase])
+                if not total:
+                    continue
+                rows.append((phase, total, self.sums[phase] / total, self.quantile(phase, 0.5),
+                             self.quantile(phase, 0.95), self.maxima[phase]))
+        return rows
+
+    def slowest_hosts(self, limit: int = 10) -> List[Tuple[str, float, Dict[str, float]]]:
+        """
+        按平均总耗时返回最慢的主机
+
+        Returns:
+            [(主机, 平均总耗时, {阶段: 平均耗时}), ...]
+        """
+        with self._lock:
+            hosts = [(host, {phase: entry[1] / entry[0] for phase, entry in summary.items() if entry[0]})
+                     for host, summary in self.hosts.items() if 'total' in summary]
+        hosts.sort(key=lambda item: item[1]['total'], reverse=True)
+        return [(host, averages['total'], averages) for host, averages in hosts[:limit]]
+
+    def to_prometheus(self, prefix: str = 'http_scanner') -> str:
+        """
+        导出为Prometheus文本格式
+        """
+        lines = [
+            f"# HELP {prefix}_phase_seconds Latency of each HTTP probe phase.",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        with self._lock:
+            for phase in self.PHASES:
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS, self.counts[phase]):
+                    cumulative += count
+                    lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+                cumulative += self.counts[phase][-1]
+                lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {cumulative}')
+                lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {self.sums[phase]:.6f}')
+                lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {cumulative}')
+            lines.append(f"# HELP {prefix}_probes_total HTTP probes by outcome.")
+            lines.append(f"# TYPE {prefix}_probes_total counter")
+            for outcome, count in sorted(self.outcomes.items()):
+                lines.append(f'{prefix}_probes_total{{outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict:
+        """
+        导出为可序列化的字典，供多进程扫描时汇总
+        """
+        with self._lock:
+            return {
+                'counts': self.counts,
+                'sums': self.sums,
+                'maxima': self.maxima,
+                'hosts': dict(self.hosts),
+                'outcomes': self.outcomes,
+            }
+
+    def merge(self, data: Dict):
+        """
+        合并另一个进程导出的统计
+        """
+        with self._lock:
+            for phase in self.PHASES:
+                self.counts[phase] = [a + b for a, b in zip(self.counts[phase], data['counts'][phase])]
+                self.sums[phase] += data['sums'][phase]
+                self.maxima[phase] = max(self.maxima[phase], data['maxima'][phase])
+            for host, summary in data['hosts'].items():
+                target = self.hosts.setdefault(host, {})
+                for phase, (count, total) in summary.items():
+                    entry = target.setdefault(phase, [0, 0.0])
+                    entry[0] += count
+                    entry[1] += total
+            while len(self.hosts) > self.max_hosts:
+                self.hosts.popitem(last=False)
+            for outcome, count in data['outcomes'].items():
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+敏感路径探测阶段
+根路径探测结束后，对每个存活的源站(域名, 端口, 协议)按字典请求敏感路径；
+每个源站先请求一个随机路径作为基线并缓存，与基线状态码和响应指纹都相同的响应
+（软404、泛路由到首页、WAF统一拦截页）直接丢弃
+"""
+
+import threading
+import uuid
+from typing import Dict, Iterator, List, Set, Tuple
+
+
+class PathProbe:
+    def __init__(self, paths: List[str]):
+        """
+        Args:
+            paths: 要探测的路径列表
+        """
+        self.paths = paths
+        # 本批次根路径探测中有HTTP响应的源站
+        self.origins: List[Tuple[str, int, str]] = []
+        # (域名, 端口, 协议) -> {'status_code': 状态码, 'fingerprint': 响应指纹}
+        self.baselines: Dict[Tuple[str, int, str], Dict] = {}
+        # 续扫时已记录命中的(域名, 端口, 路径)，不再重复探测
+        self.done: Set[Tuple[str, int, str]] = set()
+        self.requests = 0
+        self.hits = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load_wordlist(path: str) -> List[str]:
+        """
+        读取路径字典，每行一个路径，忽略空行和#开头的注释
+
+        Returns:
+            去重后以/开头的路径列表
+        """
+        paths = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                paths.append('/' + line.lstrip('/'))
+        return list(dict.fromkeys(paths))
+
+    @staticmethod
+    def random_path() -> str:
+        return f"/{uuid.uuid4().hex[:16]}"
+
+    def add_origin(self, domain: str, port: int, protocol: str):
+        with self._lock:
+            self.origins.append((domain, port, protocol))
+
+    def take_origins(self) -> List[Tuple[str, int, str]]:
+        """
+        取出本批次收集到的源站
+        """
+        with self._lock:
+            origins, self.origins = self.origins, []
+        return origins
+
+    def store_baseline(self, origin: Tuple[str, int, str], outcome: Tuple):
+        """
+        记录源站随机路径请求的结果（test_url的返回值）
+        """
+        _, status_code, _, _, _, _, extra = outcome
+        with self._lock:
+            self.requests += 1
+            self.baselines[origin] = {'status_code': status_code, 'fingerprint': extra.get('fingerprint')}
+
+    def iter_units(self, origins: List[Tuple[str, int, str]]) -> Iterator[Tuple[str, int, str, str]]:
+        """
+        展开为(域名, 端口, 协议, 路径)工作单元，基线请求失败的源站跳过
+        """
+        for path in self.paths:
+            for origin in origins:
+                baseline = self.baselines.get(origin)
+                if baseline is not None and baseline['status_code'] and (origin[0], origin[1], path) not in self.done:
+                    yield origin + (path,)
+
+    def is_interesting(self, origin: Tuple[str, int, str], outcome: Tuple) -> bool:
+        """
+        判断路径响应是否与源站基线不同，并更新统计
+        """
+        success, status_code, _, _, _, _, extra = outcome
+        baseline = self.baselines.get(origin)
+        interesting = success and not (baseline is not None and status_code == baseline['status_code']
+                                       and extra.get('fingerprint') == baseline['fingerprint'])
+        with self._lock:
+            self.requests += 1
+            if interesting:
+                self.hits += 1
+            elif success:
+                self.dropped += 1
+        return interesting
+
+    def finish_batch(self):
+        """
+        一个批次的路径探测结束，释放该批次源站的基线
+        """
+        with self._lock:
+            self.baselines = {}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hits': self.hits,
+                'dropped': self.dropped,
+            }
+
+    def merge(self, stats: Dict):
+        with self._lock:
+            self.requests += stats['requests']
+            self.hits += stats['hits']
+            self.dropped += stats['dropped']
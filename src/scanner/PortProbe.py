@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+异步TCP端口预探测
+在发送HTTP请求前，用较短的连接超时批量探测(主机, 端口)是否开放，
+只有开放的端口才进入HTTP探测阶段，避免在关闭/被过滤的端口上浪费整个请求超时；
+启用协议识别时在同一个连接上发送TLS ClientHello，根据对端回应的首字节判断
+端口说的是TLS还是明文HTTP
+"""
+
+import asyncio
+import ssl
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class PortProbe:
+    def __init__(self, connect_timeout: float = 1.0, concurrency: int = 500,
+                 detect_protocol: bool = False, sniff_timeout: float = 0):
+        """
+        初始化端口探测器
+
+        Args:
+            connect_timeout: TCP连接超时时间（秒）
+            concurrency: 同时进行的连接探测数
+            detect_protocol: 是否识别端口使用的协议（http/https）
+            sniff_timeout: 等待对端回应ClientHello的时间（秒），0表示与connect_timeout一致
+        """
+        self.connect_timeout = connect_timeout
+        self.concurrency = max(1, concurrency)
+        self.detect_protocol = detect_protocol
+        self.sniff_timeout = sniff_timeout or connect_timeout
+        self._client_hello = self.build_client_hello() if detect_protocol else b''
+
+    @staticmethod
+    def build_client_hello() -> bytes:
+        """
+        用内存BIO生成一份TLS ClientHello，所有探测共用
+        """
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        outgoing = ssl.MemoryBIO()
+        tls = context.wrap_bio(ssl.MemoryBIO(), outgoing)
+        try:
+            tls.do_handshake()
+        except ssl.SSLWantReadError:
+            pass
+        return outgoing.read()
+
+    async def check(self, host: str, port: int) -> Optional[str]:
+        """
+        对单个(主机, 端口)做一次完整的TCP connect，启用协议识别时顺带识别协议
+
+        Returns:
+            端口关闭时为None；开放时为识别出的协议，未识别时为空字符串
+        """
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port),
+                                                    timeout=self.connect_timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        except Exception:
+            return None
+
+        protocol = ''
+        try:
+            if self.detect_protocol:
+                protocol = await self.sniff(reader, writer)
+        except Exception:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+        return protocol
+
+    async def sniff(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> str:
+        """
+        发送ClientHello并根据回应识别协议：
+        TLS握手(0x16)或告警(0x15)记录为https，以"HTTP/"或HTML开头的回应为http；
+        明文HTTP服务通常会等待请求头结束，超时后补发空行促使其返回400
+        """
+        writer.write(self._client_hello)
+        await writer.drain()
+        try:
+            data = await asyncio.wait_for(reader.read(16), timeout=self.sniff_timeout)
+        except asyncio.TimeoutError:
+            writer.write(b'\r\n\r\n')
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(16), timeout=self.sniff_timeout)
+
+        if data[:1] in (b'\x16', b'\x15'):
+            return 'https'
+        # 部分服务器对无法解析的请求行按HTTP/0.9直接返回错误页，没有状态行
+        if data.startswith((b'HTTP/', b'<')):
+            return 'http'
+        return ''
+
+    async def sweep(self, targets: Iterable[Tuple[str, int]], exit_handler=None) -> Dict[Tuple[str, int], str]:
+        """
+        并发探测所有(主机, 端口)
+
+        Returns:
+            开放的(主机, 端口) -> 识别出的协议（未识别时为空字符串）
+        """
+        open_ports = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+
+        async def check_one(host: str, port: int):
+            protocol = await self.check(host, port)
+            if protocol is not None:
+                open_ports[(host, port)] = protocol
+
+        def on_done(task: asyncio.Task):
+            pending.discard(task)
+            semaphore.release()
+
+        for host, port in targets:
+            if exit_handler is not None and exit_handler.exit_now:
+                break
+            await semaphore.acquire()
+            task = asyncio.create_task(check_one(host, port))
+            pending.add(task)
+            task.add_done_callback(on_done)
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return open_ports
+
+    def sweep_sync(self, targets: Iterable[Tuple[str, int]], exit_handler=None) -> Dict[Tuple[str, int], str]:
+        """
+        同步版本的sweep，供线程引擎使用
+        """
+        return asyncio.run(self.sweep(targets, exit_handler))
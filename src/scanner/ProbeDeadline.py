@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+探测截止时间与慢速读取保护
+请求超时只约束单次socket操作，每隔几秒吐一个字节的服务器（tarpit）可以一直占住工作线程。
+这里为每个探测设置墙钟截止时间，为每个主机设置累计耗时预算，并在读取正文时检查最低传输速率；
+线程引擎中阻塞在socket上的请求由看门狗线程在截止时间到达时关闭连接打断
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class ProbeAborted(Exception):
+    """探测因超过截止时间或传输过慢被中止"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TransferGuard:
+    REASONS = {
+        'deadline': '超过截止时间',
+        'slow': '传输速率过低',
+    }
+
+    def __init__(self, limit: float = 0, min_rate: float = 0, grace: float = 2.0):
+        """
+        Args:
+            limit: 探测允许的最长耗时（秒），0表示不限制
+            min_rate: 读取正文的最低速率（字节/秒），0表示不检查
+            grace: 开始检查速率前的宽限时间（秒）
+        """
+        self.limit = limit
+        self.min_rate = min_rate
+        self.grace = grace
+        self.deadline = 0.0
+        self.started = time.monotonic()
+        self.body_started = self.started
+        self.received = 0
+        self.reason = ''
+
+    def arm(self):
+        """
+        开始计时（拿到发送名额后调用，排队时间不计入截止时间）
+        """
+        self.started = time.monotonic()
+        if self.limit:
+            self.deadline = self.started + self.limit
+
+    def begin_body(self):
+        """
+        收到响应头后调用，开始统计正文传输速率
+        """
+        self.body_started = time.monotonic()
+        self.received = 0
+
+    def feed(self, nbytes: int) -> bool:
+        """
+        记录读到的正文字节数
+
+        Returns:
+            是否应中止读取
+        """
+        self.received += nbytes
+        now = time.monotonic()
+        if self.deadline and now >= self.deadline:
+            self.reason = 'deadline'
+        elif self.min_rate:
+            elapsed = now - self.body_started
+            if elapsed >= self.grace and self.received / elapsed < self.min_rate:
+                self.reason = 'slow'
+        return bool(self.reason)
+
+    def expire(self):
+        if not self.reason:
+            self.reason = 'deadline'
+
+    def describe(self) -> str:
+        return self.REASONS.get(self.reason, self.reason)
+
+
+class ProbeDeadline:
+    def __init__(self, probe_deadline: float = 0, host_deadline: float = 0, min_rate: float = 0,
+                 grace: float = 2.0, max_hosts: int = 100000):
+        """
+        初始化截止时间策略
+
+        Args:
+            probe_deadline: 单个探测的墙钟截止时间（秒），0表示不限制
+            host_deadline: 单个主机所有探测的累计耗时预算（秒），0表示不限制
+            min_rate: 读取正文的最低速率（字节/秒），0表示不检查
+            grace: 开始检查速率前的宽限时间（秒）
+            max_hosts: 记录耗时的最大主机数，超出后淘汰最久未探测的主机
+        """
+        self.probe_deadline = probe_deadline
+        self.host_deadline = host_deadline
+        self.min_rate = min_rate
+        self.grace = grace
+        self.max_hosts = max_hosts
+        self.host_spent: 'OrderedDict[str, float]' = OrderedDict()
+        self.aborted: Dict[str, int] = {}
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.probe_deadline or self.host_deadline or self.min_rate)
+
+    def begin(self, host: str) -> Optional[TransferGuard]:
+        """
+        为主机上的一个探测创建保护对象
+
+        Returns:
+            主机耗时预算已用完时返回None，应跳过该探测
+        """
+        limit = self.probe_deadline
+        if self.host_deadline:
+            with self._lock:
+                remaining = self.host_deadline - self.host_spent.get(host, 0.0)
+                if remaining <= 0:
+                    self.skipped += 1
+                    return None
+            limit = min(limit, remaining) if limit else remaining
+        return TransferGuard(limit, self.min_rate, self.grace)
+
+    def end(self, host: str, guard: TransferGuard):
+        """
+        探测结束，累计主机耗时并统计中止原因
+        """
+        elapsed = time.monotonic() - guard.started
+        with self._lock:
+            if guard.reason:
+                self.aborted[guard.reason] = self.aborted.get(guard.reason, 0) + 1
+            if self.host_deadline:
+                self.host_spent[host] = self.host_spent.get(host, 0.0) + elapsed
+                self.host_spent.move_to_end(host)
+                if len(self.host_spent) > self.max_hosts:
+                    self.host_spent.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'deadline': self.aborted.get('deadline', 0),
+                'slow': self.aborted.get('slow', 0),
+                'skipped': self.skipped,
+            }
+
+    def merge(self, stats: Dict):
+        with self._lock:
+            for reason in ('deadline', 'slow'):
+                self.aborted[reason] = self.aborted.get(reason, 0) + stats[reason]
+            self.skipped += stats['skipped']
+
+
+class DeadlineWatchdog:
+    """在截止时间到达时执行回调（线程引擎用于关闭阻塞中的连接）"""
+
+    def __init__(self):
+        self._heap = []
+        self._active = set()
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def watch(self, deadline: float, callback: Callable[[], None]) -> int:
+        """
+        登记一个截止时间
+
+        Returns:
+            用于cancel的编号
+        """
+        token = next(self._counter)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, token, callback))
+            self._active.add(token)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='DeadlineWatchdog', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return token
+
+    def cancel(self, token: int):
+        """
+        取消截止时间；返回后回调保证不会再执行
+        """
+        with self._cond:
+            self._active.discard(token)
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][1] not in self._active:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, token, callback = self._heap[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                self._active.discard(token)
+                # 持有锁执行回调，与cancel互斥
+                try:
+                    callback()
+                except Exception:
+                    pass
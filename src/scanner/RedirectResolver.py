@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+跳转链解析
+对3xx响应继续沿Location逐跳请求直到最终落地页，支持最大跳数和循环检测；
+已解析过的跳转和最终落地页按URL缓存，成千上万个跳转到同一SSO登录页的主机
+只需真正请求一次落地页
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class RedirectChain:
+    def __init__(self, resolver: 'RedirectResolver', url: str, location: str):
+        """
+        Args:
+            resolver: 所属的跳转解析器（提供缓存和最大跳数）
+            url: 初始请求的URL
+            location: 初始响应的跳转URL
+        """
+        self.resolver = resolver
+        self.chain = [url]
+        self.visited = {url}
+        self.next_url: Optional[str] = location or None
+        self.final_status = 0
+        self.final_title = ""
+        self.note = ""
+        self._advance()
+
+    def _advance(self):
+        """
+        沿缓存走完所有已知的跳转，直到需要真正发请求或链已结束
+        """
+        while self.next_url:
+            if self.next_url in self.visited:
+                self.note = "跳转循环"
+                self.next_url = None
+                break
+            if len(self.chain) > self.resolver.max_hops:
+                self.note = f"超过{self.resolver.max_hops}跳"
+                self.next_url = None
+                break
+
+            cached = self.resolver.lookup(self.next_url)
+            if cached is None:
+                break
+            status_code, location, title = cached
+            self._append(self.next_url, status_code, location, title)
+
+    def advance(self) -> bool:
+        """
+        等待其他探测解析完同一跳后调用，沿缓存继续前进
+
+        Returns:
+            是否有进展（下一跳已在缓存中）
+        """
+        length = len(self.chain)
+        self._advance()
+        return len(self.chain) > length or not self.next_url
+
+    def _append(self, url: str, status_code: int, location: str, title: str):
+        self.chain.append(url)
+        self.visited.add(url)
+        self.final_status = status_code
+        self.final_title = title
+        self.next_url = location or None
+
+    def step(self, url: str, status_code: int, location: str = "", title: str = ""):
+        """
+        记录一次真正请求的跳转结果，并继续沿缓存前进
+
+        Args:
+            url: 本跳请求的URL
+            status_code: 响应状态码，请求失败时为0
+            location: 响应的跳转URL，没有时为空
+            title: 落地页标题
+        """
+        if status_code:
+            self.resolver.store(url, status_code, location, title)
+        else:
+            self.resolver.release(url)
+        self._append(url, status_code, location, title)
+        if status_code:
+            self._advance()
+        else:
+            self.note = "请求失败"
+            self.next_url = None
+
+    def finish(self) -> Dict:
+        """
+        Returns:
+            附加到结果中的跳转链字段
+        """
+        chain = " -> ".join(self.chain)
+        if self.note:
+            chain += f" [{self.note}]"
+        return {
+            'redirect_chain': chain,
+            'final_url': self.chain[-1],
+            'final_status': self.final_status,
+            'final_title': self.final_title,
+        }
+
+
+class RedirectResolver:
+    def __init__(self, max_hops: int = 5, max_entries: int = 100000):
+        """
+        初始化跳转解析器
+
+        Args:
+            max_hops: 最多跟随的跳转次数，0表示不跟随跳转
+            max_entries: 缓存的最大URL条数，超出后淘汰最早的条目
+        """
+        self.max_hops = max_hops
+        self.max_entries = max_entries
+        # URL -> (状态码, 跳转URL, 标题)；落地页的跳转URL为空
+        self.cache: 'OrderedDict[str, Tuple[int, str, str]]' = OrderedDict()
+        self.requests = 0
+        self.cache_hits = 0
+        # 多进程扫描时从各分片汇总的落地页数
+        self.merged_final_urls = 0
+        # 正在被某个探测请求的URL，其他探测等待其结果而不重复请求
+        self.pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_hops > 0
+
+    def start(self, url: str, location: str) -> RedirectChain:
+        """
+        从一个3xx响应开始解析跳转链
+        """
+        return RedirectChain(self, url, location)
+
+    def lookup(self, url: str) -> Optional[Tuple[int, str, str]]:
+        with self._lock:
+            cached = self.cache.get(url)
+            if cached is not None:
+                self.cache_hits += 1
+            return cached
+
+    def claim(self, url: str) -> bool:
+        """
+        申请请求某一跳，同一URL同时只由一个探测请求
+
+        Returns:
+            True 由调用方请求；False 已缓存或正由其他探测请求，应等待后沿缓存前进
+        """
+        with self._lock:
+            if url in self.cache or url in self.pending:
+                return False
+            self.pending[url] = threading.Event()
+            return True
+
+    def wait(self, url: str, timeout: float):
+        """
+        等待其他探测请求完该URL（线程引擎使用）
+        """
+        event = self.pending.get(url)
+        if event is not None:
+            event.wait(timeout)
+
+    async def wait_async(self, url: str, timeout: float):
+        """
+        等待其他探测请求完该URL（异步引擎使用）
+        """
+        deadline = time.monotonic() + timeout
+        while url in self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    def store(self, url: str, status_code: int, location: str, title: str):
+        with self._lock:
+            self.requests += 1
+            self.cache[url] = (status_code, location, title)
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+            self._release(url)
+
+    def release(self, url: str):
+        """
+        请求失败时放弃对该URL的占用
+        """
+        with self._lock:
+            self._release(url)
+
+    def _release(self, url: str):
+        event = self.pending.pop(url, None)
+        if event is not None:
+            event.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            final_urls = sum(1 for _, location, _ in self.cache.values() if not location)
+            return {
+                'requests': self.requests,
+                'cache_hits': self.cache_hits,
+                'final_urls': final_urls + self.merged_final_urls,
+            }
+
+    def merge(self, stats: Dict):
+        """
+        汇总分片子进程的统计（各进程缓存独立，落地页数按进程累加）
+        """
+        with self._lock:
+            self.requests += stats['requests']
+            self.cache_hits += stats['cache_hits']
+            self.merged_final_urls += stats['final_urls']
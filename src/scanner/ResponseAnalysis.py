@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+单个响应的正文分析
+以推送方式接收响应正文分块，线程引擎和异步引擎共用：
+先收集正文前缀计算响应指纹（只用于聚类），200响应同时流式提取标题；
+开启技术栈识别或正文存储时同时保留正文（截断到上限）
+"""
+
+from typing import Dict, Tuple
+
+
+class ResponseAnalysis:
+    def __init__(self, scanner, url: str, status_code: int, headers):
+        """
+        Args:
+            scanner: HttpScanner实例
+            url: 请求的URL
+            status_code: 响应状态码
+            headers: 响应头
+        """
+        self.scanner = scanner
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.index = scanner.fingerprints
+
+        self.prefix = bytearray()
+        self.fingerprint = None
+        # 只有200响应需要提取标题
+        self.sniffer = scanner.create_title_sniffer(headers) if status_code == 200 else None
+        self.done = False
+        # 技术栈识别和正文存储使用的正文，读满上限即可停止
+        self.tech = scanner.tech
+        self.store = scanner.body_store
+        self.body_limit = max(self.tech.body_limit if self.tech is not None else 0,
+                              self.store.max_bytes if self.store is not None else 0)
+        self.body = bytearray() if self.body_limit else None
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        写入一段响应正文
+
+        Returns:
+            是否已经可以停止读取
+        """
+        if self.body is not None and len(self.body) < self.body_limit:
+            self.body.extend(chunk[:self.body_limit - len(self.body)])
+        if not self.done:
+            self.done = self._feed(chunk)
+        return self.done and self._body_done()
+
+    def _body_done(self) -> bool:
+        if self.body is None or len(self.body) >= self.body_limit:
+            return True
+        if self.store is not None:
+            # 正文存储需要完整（截断到上限）的正文
+            return False
+        # 只做技术栈识别时，相同指纹的正文匹配结果已有缓存
+        return self.tech.has_cached(self.fingerprint)
+
+    def _feed(self, chunk: bytes) -> bool:
+        """
+        指纹和标题提取部分，返回是否已完成
+        """
+        if self.fingerprint is None:
+            room = self.index.prefix_size - len(self.prefix)
+            self.prefix.extend(chunk[:room])
+            if len(self.prefix) < self.index.prefix_size:
+                return False
+            self._on_prefix_complete()
+            if self.done:
+                return True
+            chunk = chunk[room:]
+
+        if self.sniffer is None or not self.sniffer.is_html:
+            self.done = True
+        elif chunk and self.sniffer.feed(chunk):
+            self.done = True
+        return self.done
+
+    def _on_prefix_complete(self):
+        """
+        正文前缀已收集完毕：计算指纹，再从前缀中提取标题
+        """
+        self.fingerprint = self.index.compute(self.url, self.status_code, self.headers, bytes(self.prefix))
+        if self.sniffer is None:
+            self.done = True
+            return
+
+        # 指纹相同的页面标题可能不同（如回显了主机名），标题总是从本响应中提取
+        if self.sniffer.is_html and self.sniffer.feed(self.prefix):
+            self.done = True
+
+    def finish(self) -> Tuple[str, Dict]:
+        """
+        正文读取结束（或提前停止）后调用
+
+        Returns:
+            (标题, 附加到结果中的字段)
+        """
+        if self.fingerprint is None:
+            # 正文比指纹前缀还短
+            self._on_prefix_complete()
+
+        title = self.sniffer.get_title() if self.sniffer is not None else ""
+        extra = {'fingerprint': self.fingerprint}
+        if self.tech is not None:
+            extra['tech'] = self.tech.match(self.headers, title, bytes(self.body), self.fingerprint)
+        if self.store is not None:
+            # 只在结果确认命中后由HttpScanner写入存储，不会进入结果字典
+            extra['body'] = bytes(self.body)
+        return title, extra
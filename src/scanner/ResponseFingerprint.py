@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+响应指纹与聚类
+对响应计算廉价指纹（状态码 + 关键响应头 + 规范化后的正文前缀哈希），
+相同的停放页、CDN错误页、泛解析页面会落入同一簇，报告中同簇的大量重复响应被折叠。
+指纹去掉了主机名和数字，同簇响应的标题可能不同，只用于聚类和统计
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+from urllib.parse import urlparse
+
+
+class FingerprintIndex:
+    # 规范化时去掉的动态内容：长十六进制串（会话ID、哈希）、数字（时间戳、请求ID）、空白
+    DYNAMIC_TOKENS = re.compile(rb'[0-9a-fA-F]{16,}|\d+')
+    WHITESPACE = re.compile(rb'\s+')
+    KEY_HEADERS = ('Server', 'Content-Type', 'X-Powered-By')
+
+    def __init__(self, prefix_size: int = 4096, cluster_threshold: int = 3, max_small_clusters: int = 100000):
+        """
+        初始化指纹索引
+
+        Args:
+            prefix_size: 参与指纹计算的正文前缀字节数
+            cluster_threshold: 同一指纹出现超过该次数后在输出中折叠
+            max_small_clusters: 未达到折叠阈值的簇最多保留的个数，超出后淘汰最久未出现的
+        """
+        self.prefix_size = prefix_size
+        self.cluster_threshold = cluster_threshold
+        self.max_small_clusters = max_small_clusters
+        # 达到折叠阈值的簇：指纹 -> {'count': 出现次数, 'url': 示例URL, 'shown': 已显示次数}
+        self.clusters: Dict[str, Dict] = {}
+        # 未达到阈值的簇只保留计数，按LRU淘汰：指纹 -> [出现次数, 已显示次数]
+        # 绝大多数指纹只出现一次，不能让它们随扫描规模无限增长
+        self.small_clusters: 'OrderedDict[str, List]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compute(self, url: str, status_code: int, headers, body_prefix: bytes) -> str:
+        """
+        计算响应指纹
+        """
+        parsed_url = urlparse(url)
+        host = (parsed_url.hostname or '').encode('utf-8', 'ignore')
+        path = parsed_url.path.lower().encode('utf-8', 'ignore') if len(parsed_url.path) > 1 else b''
+        body = body_prefix[:self.prefix_size].lower()
+        # 页面中回显的主机名和请求路径会让相同的泛解析页面/软404页面指纹不同，先去掉
+        if host:
+            body = body.replace(host, b'')
+        if path:
+            body = body.replace(path, b'')
+        body = self.DYNAMIC_TOKENS.sub(b'0', body)
+        body = self.WHITESPACE.sub(b' ', body)
+
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(str(status_code).encode())
+        for name in self.KEY_HEADERS:
+            digest.update(b'\0' + headers.get(name, '').split(';')[0].strip().lower().encode('utf-8', 'ignore'))
+        location = headers.get('Location', '')
+        if location:
+            # 跳转到同一路径（如统一登录页）的响应视为相同
+            parsed = urlparse(location)
+            target = (parsed.netloc + parsed.path).lower().encode('utf-8', 'ignore')
+            if path:
+                # 把请求路径原样带入跳转目标的（如 /x -> /x/）按同一种跳转处理
+                target = target.replace(path, b'')
+            digest.update(b'\0' + target)
+        digest.update(b'\0' + body)
+        return digest.hexdigest()
+
+    def add(self, fingerprint: str, url: str) -> int:
+        """
+        把一个命中结果加入所属的簇
+
+        Returns:
+            该簇当前的大小
+        """
+        if not fingerprint:
+            return 0
+        with self._lock:
+            cluster = self.clusters.get(fingerprint)
+            if cluster is not None:
+                cluster['count'] += 1
+                return cluster['count']
+
+            small = self.small_clusters.get(fingerprint)
+            if small is None:
+                small = self.small_clusters[fingerprint] = [0, 0]
+                if len(self.small_clusters) > self.max_small_clusters:
+                    self.small_clusters.popitem(last=False)
+            else:
+                self.small_clusters.move_to_end(fingerprint)
+            small[0] += 1
+            if small[0] >= self.cluster_threshold:
+                # 达到阈值后才保存完整信息，示例URL取达到阈值时的这一条
+                del self.small_clusters[fingerprint]
+                self.clusters[fingerprint] = {'count': small[0], 'url': url, 'shown': small[1]}
+            return small[0]
+
+    def claim_display(self, fingerprint: str) -> int:
+        """
+        申请在控制台显示该簇的一条结果
+
+        Returns:
+            1 可以显示；0 刚超过阈值，应提示后续折叠；-1 已折叠不再显示
+        """
+        with self._lock:
+            cluster = self.clusters.get(fingerprint)
+            if cluster is None:
+                small = self.small_clusters.get(fingerprint)
+                if small is not None:
+                    small[1] += 1
+                return 1
+            cluster['shown'] += 1
+            if cluster['shown'] <= self.cluster_threshold:
+                return 1
+            return 0 if cluster['shown'] == self.cluster_threshold + 1 else -1
+
+    def get_count(self, fingerprint: str) -> int:
+        with self._lock:
+            cluster = self.clusters.get(fingerprint)
+            if cluster is not None:
+                return cluster['count']
+            small = self.small_clusters.get(fingerprint)
+            return small[0] if small else 0
+
+    def is_collapsed(self, fingerprint: str) -> bool:
+        """
+        该指纹所在的簇是否需要折叠
+        """
+        return self.get_count(fingerprint) > self.cluster_threshold
+
+    def top_clusters(self, limit: int = 10):
+        """
+        返回最大的若干个需要折叠的簇
+
+        Returns:
+            [(指纹, 簇信息), ...]
+        """
+        with self._lock:
+            clusters = [(fp, dict(c)) for fp, c in self.clusters.items() if c['count'] > self.cluster_threshold]
+        clusters.sort(key=lambda item: item[1]['count'], reverse=True)
+        return clusters[:limit]
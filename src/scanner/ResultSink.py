@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+流式结果写入器
+每个命中结果一产生就交给后台写入线程，以JSONL或CSV格式追加到结果文件，
+下游工具可以实时tail结果；分类文本报告在扫描结束后从该文件生成，
+内存占用不再随命中数量增长
+"""
+
+import csv
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterator
+
+
+class ResultSink:
+    FIELDS = ['domain', 'url', 'status_code', 'title', 'redirect_url', 'port', 'protocol', 'description',
+              'fingerprint', 'redirect_chain', 'final_url', 'final_status', 'final_title',
+              'aborted', 'vhost_ip', 'vhost_diff', 'path', 'tech', 'body_hash']
+    INT_FIELDS = ['status_code', 'port', 'final_status']
+
+    _STOP = object()
+
+    def __init__(self, path: str, fmt: str = 'jsonl', flush_interval: float = 0.5, queue_size: int = 10000):
+        """
+        初始化结果写入器并启动后台写入线程
+
+        Args:
+            path: 结果文件路径
+            fmt: 文件格式，'jsonl' 或 'csv'
+            flush_interval: 最长刷新间隔（秒），保证下游能及时读到结果
+            queue_size: 待写入队列长度，写入跟不上时阻塞生产者
+        """
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = open(path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024)
+        self._csv_writer = None
+        if fmt == 'csv':
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=self.FIELDS, extrasaction='ignore')
+            self._csv_writer.writeheader()
+
+        self._thread = threading.Thread(target=self._run, name='ResultSink', daemon=True)
+        self._thread.start()
+
+    def write(self, result: Dict):
+        """
+        提交一条结果，由后台线程写入文件
+        """
+        self._queue.put(result)
+
+    def _write_record(self, result: Dict):
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(result)
+        else:
+            self._file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                result = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                result = None
+
+            if result is self._STOP:
+                break
+            if result is not None:
+                self._write_record(result)
+
+            # 队列已空或超过刷新间隔时落盘，避免每条结果都触发一次写系统调用
+            now = time.monotonic()
+            if self._queue.empty() or now - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = now
+
+        self._file.flush()
+
+    def close(self):
+        """
+        写完队列中剩余的结果并关闭文件
+        """
+        if self._file.closed:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._file.close()
+
+    @classmethod
+    def iter_results(cls, path: str, fmt: str = 'jsonl') -> Iterator[Dict]:
+        """
+        流式读取结果文件
+        """
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if fmt == 'csv':
+                for row in csv.DictReader(f):
+                    for field in cls.INT_FIELDS:
+                        row[field] = int(row[field]) if row.get(field) else 0
+                    yield row
+            else:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+扫描检查点日志
+每完成一个(域名, 端口)探测就追加写入一行JSON，扫描中断后可以用 --resume
+跳过已完成的探测，并把之前的命中结果合并进最终报告；
+存活源站的敏感路径探测完成后单独记录，续扫时补做未完成的源站
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class ScanJournal:
+    def __init__(self, path: str, resume: bool = False, fsync_interval: float = 1.0):
+        """
+        初始化检查点日志
+
+        Args:
+            path: 日志文件路径
+            resume: 是否加载已有日志继续扫描，否则清空重写
+            fsync_interval: 两次fsync之间的最短间隔（秒），保证主机重启后日志不丢失
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        # 只在续扫时从已有日志加载，本次扫描完成的探测只写入日志，避免内存随输入规模增长
+        self.completed: Set[Tuple[str, int]] = set()
+        self.results: List[Dict] = []
+        # 续扫时恢复：根路径已探测、敏感路径探测未完成的源站 (域名, 端口) -> 协议
+        self.origins: Dict[Tuple[str, int], str] = {}
+        # 续扫时恢复：已记录命中的敏感路径 (域名, 端口, 路径)
+        self.path_hits: Set[Tuple[str, int, str]] = set()
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+
+        if resume:
+            self.load()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def load(self):
+        """
+        读取已有日志，恢复已完成的探测和命中结果
+        """
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 进程被强制结束时最后一行可能不完整
+                    continue
+                domain = record.get('domain')
+                if 'skipped' in record:
+                    for port in record['skipped']:
+                        self.completed.add((domain, port))
+                    continue
+                if 'paths_done' in record:
+                    self.origins.pop((domain, record.get('port')), None)
+                    continue
+                self.completed.add((domain, record.get('port')))
+                if record.get('origin'):
+                    self.origins[(domain, record.get('port'))] = record['origin']
+                result = record.get('result')
+                if result:
+                    self.results.append(result)
+                    if result.get('path'):
+                        self.path_hits.add((domain, record.get('port'), result['path']))
+
+    def is_done(self, domain: str, port: int) -> bool:
+        return (domain, port) in self.completed
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def record(self, domain: str, port: int, result: Optional[Dict] = None, origin: Optional[str] = None):
+        """
+        记录一个已完成的探测，result为命中时的结果字典，origin为需要做敏感路径探测的源站协议
+        """
+        record = {'domain': domain, 'port': port, 'result': result}
+        if origin:
+            record['origin'] = origin
+        self._write(record)
+
+    def record_paths_done(self, origins: Iterable[Tuple[str, int, str]]):
+        """
+        记录已完成敏感路径探测的源站
+        """
+        for domain, port, _ in origins:
+            self._write({'domain': domain, 'port': port, 'paths_done': True})
+
+    def record_skipped(self, domain: str, ports: Iterable[int]):
+        """
+        记录无需HTTP探测的端口（域名无法解析或端口未开放），续扫时跳过已记录过的端口
+        """
+        ports = [port for port in ports if (domain, port) not in self.completed]
+        if not ports:
+            return
+        self._write({'domain': domain, 'skipped': ports})
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
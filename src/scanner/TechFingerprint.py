@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+基于特征库的技术栈识别
+从JSON特征文件加载响应头、Cookie、正文和标题特征，每个位置的所有特征编译成一个多模式匹配器：
+字面量特征放进一个Aho-Corasick自动机（未安装pyahocorasick时退化为前缀树正则），
+正则特征合并成一个正则做快速排除，没有任何正则特征命中的响应正文只扫描一遍
+
+特征文件格式:
+    {
+        "Nginx": {"headers": {"Server": "re:nginx(?:/([\\d.]+))?"}},
+        "Shiro": {"cookies": {"rememberMe": ""}},
+        "WordPress": {"body": ["/wp-content/", "/wp-includes/"], "title": "WordPress"}
+    }
+普通字符串为不区分大小写的子串匹配，"re:" 开头为正则（第一个分组为版本号，不能使用命名分组），
+Cookie特征为空字符串时表示只要存在该Cookie即匹配
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+
+class PatternSet:
+    """同一位置（正文、标题、某个响应头或Cookie）的所有特征，编译后一次扫描得到全部命中"""
+
+    def __init__(self):
+        # 小写字面量 -> 技术名列表
+        self.literals: Dict[str, List[str]] = {}
+        # (技术名, 正则)
+        self.regexes: List = []
+        # 无需匹配内容、只要位置存在即命中的技术
+        self.always: List[str] = []
+        self.automaton = None
+        self.literal_regex = None
+        self.literal_lengths: List[int] = []
+        self.combined = None
+        # 逐条确认用的 (技术名, 编译后的正则)
+        self.compiled: List = []
+
+    def add(self, tech: str, pattern: str):
+        if pattern.startswith('re:'):
+            self.regexes.append((tech, pattern[3:]))
+        elif pattern:
+            self.literals.setdefault(pattern.lower(), []).append(tech)
+        else:
+            self.always.append(tech)
+
+    def compile(self):
+        if self.literals:
+            if HAS_AHOCORASICK:
+                self.automaton = ahocorasick.Automaton()
+                for literal, techs in self.literals.items():
+                    self.automaton.add_word(literal, techs)
+                self.automaton.make_automaton()
+            else:
+                # 前缀树结构的正则放在前瞻中，每个位置只需沿树匹配一次
+                self.literal_regex = re.compile(f"(?=({self._trie_pattern(self.literals)}))", re.S)
+                self.literal_lengths = sorted({len(literal) for literal in self.literals})
+        if self.regexes:
+            self.combined = re.compile('|'.join(f"(?:{pattern})" for _, pattern in self.regexes), re.I | re.S)
+            self.compiled = [(tech, re.compile(pattern, re.I | re.S)) for tech, pattern in self.regexes]
+
+    @staticmethod
+    def _trie_pattern(literals: Iterable[str]) -> str:
+        """
+        把字面量集合编译成前缀树结构的正则，较长的分支优先
+        """
+        trie = {}
+        for literal in literals:
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            # 当前节点本身是一个字面量的结尾时，后续分支可选
+            if '' in node:
+                pattern = f"(?:{pattern})?"
+            return pattern
+
+        return build(trie)
+
+    def scan(self, text: str) -> Dict[str, str]:
+        """
+        扫描文本
+
+        Returns:
+            {技术名: 版本号}，版本号未知时为空字符串
+        """
+        found = {tech: '' for tech in self.always}
+        if self.automaton is not None:
+            for _, techs in self.automaton.iter(text.lower()):
+                for tech in techs:
+                    found.setdefault(tech, '')
+        elif self.literal_regex is not None:
+            for match in self.literal_regex.finditer(text.lower()):
+                matched = match.group(1)
+                # 前瞻只给出每个位置最长的匹配，较短的字面量是它的前缀
+                for length in self.literal_lengths:
+                    if length > len(matched):
+                        break
+                    for tech in self.literals.get(matched[:length], ()):
+                        found.setdefault(tech, '')
+        # 合并正则的匹配互不重叠，同一位置只有第一个分支生效，只用来排除没有任何正则命中的文本，
+        # 有命中时逐条确认，结果与逐条匹配相同
+        if self.combined is not None and self.combined.search(text):
+            for tech, regex in self.compiled:
+                version = None
+                for match in regex.finditer(text):
+                    if not regex.groups:
+                        version = ''
+                        break
+                    version = match.group(1) or ''
+                    if version:
+                        break
+                if version is not None and (version or tech not in found):
+                    found[tech] = version
+        return found
+
+
+class TechMatcher:
+    DEFAULT_SIGNATURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tech_signatures.json')
+    COOKIE_NAME = re.compile(r'(?:^|[,;]\s*)([^=;,\s]+)=')
+
+    def __init__(self, signature_files: List[str] = None, body_limit: int = 64 * 1024, cache_size: int = 10000):
+        """
+        加载特征文件并编译匹配器
+
+        Args:
+            signature_files: 特征文件列表，默认为内置特征库
+            body_limit: 参与匹配的正文最大字节数
+            cache_size: 按响应指纹缓存正文匹配结果的条目数
+        """
+        self.body_limit = body_limit
+        self.cache_size = cache_size
+        self.body = PatternSet()
+        self.title = PatternSet()
+        self.headers: Dict[str, PatternSet] = {}
+        self.cookies: Dict[str, PatternSet] = {}
+        self.signature_count = 0
+        # 响应指纹 -> 正文匹配结果，相同指纹的响应不必重复读取和扫描正文
+        self.body_cache: 'OrderedDict[str, Dict[str, str]]' = OrderedDict()
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        for path in signature_files or [self.DEFAULT_SIGNATURES]:
+            self.load(path)
+        for pattern_set in [self.body, self.title, *self.headers.values(), *self.cookies.values()]:
+            pattern_set.compile()
+
+    @staticmethod
+    def _patterns(value) -> List[str]:
+        return value if isinstance(value, list) else [value]
+
+    def load(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            signatures = json.load(f)
+        for tech, signature in signatures.items():
+            self.signature_count += 1
+            for name, value in signature.get('headers', {}).items():
+                for pattern in self._patterns(value):
+                    self.headers.setdefault(name.lower(), PatternSet()).add(tech, pattern)
+            for name, value in signature.get('cookies', {}).items():
+                for pattern in self._patterns(value):
+                    self.cookies.setdefault(name.lower(), PatternSet()).add(tech, pattern)
+            for pattern in self._patterns(signature.get('body', [])):
+                self.body.add(tech, pattern)
+            for pattern in self._patterns(signature.get('title', [])):
+                self.title.add(tech, pattern)
+
+    def has_cached(self, fingerprint: Optional[str]) -> bool:
+        return fingerprint is not None and fingerprint in self.body_cache
+
+    def match_body(self, body: bytes, fingerprint: Optional[str]) -> Dict[str, str]:
+        """
+        匹配正文特征，按响应指纹缓存
+        """
+        if fingerprint is not None:
+            with self._lock:
+                cached = self.body_cache.get(fingerprint)
+            if cached is not None:
+                return cached
+        found = self.body.scan(body[:self.body_limit].decode('utf-8', 'ignore'))
+        if fingerprint is not None:
+            with self._lock:
+                self.body_cache[fingerprint] = found
+                if len(self.body_cache) > self.cache_size:
+                    self.body_cache.popitem(last=False)
+        return found
+
+    def cookie_values(self, headers) -> Dict[str, str]:
+        """
+        从Set-Cookie响应头中取出 {小写Cookie名: Set-Cookie内容}
+        """
+        if hasattr(headers, 'getall'):
+            set_cookies = headers.getall('Set-Cookie', [])
+        else:
+            set_cookies = [headers.get('Set-Cookie', '')]
+        cookies = {}
+        for set_cookie in set_cookies:
+            for name in self.COOKIE_NAME.findall(set_cookie):
+                cookies.setdefault(name.lower(), set_cookie)
+        return cookies
+
+    def match(self, headers, title: str, body: bytes, fingerprint: Optional[str] = None) -> str:
+        """
+        识别响应使用的技术
+
+        Returns:
+            按名称排序、逗号分隔的技术列表，有版本号时写成 名称/版本
+        """
+        found = dict(self.match_body(body, fingerprint))
+        for name, pattern_set in self.headers.items():
+            value = headers.get(name)
+            if value is not None:
+                self._merge(found, pattern_set.scan(value))
+        if self.cookies:
+            for name, value in self.cookie_values(headers).items():
+                pattern_set = self.cookies.get(name)
+                if pattern_set is not None:
+                    self._merge(found, pattern_set.scan(value))
+        if title:
+            self._merge(found, self.title.scan(title))
+        return ", ".join(f"{tech}/{version}" if version else tech for tech, version in sorted(found.items()))
+
+    @staticmethod
+    def _merge(found: Dict[str, str], matches: Dict[str, str]):
+        for tech, version in matches.items():
+            if version or tech not in found:
+                found[tech] = version
+
+    def count(self, tech: str):
+        """
+        统计命中结果中各技术出现的次数
+        """
+        with self._lock:
+            for item in tech.split(', '):
+                name = item.split('/', 1)[0]
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def top(self, limit: int = 15) -> List:
+        with self._lock:
+            return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:limit]
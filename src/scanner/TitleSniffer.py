@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+流式页面标题与字符集嗅探器
+边下载边查找<title>，一旦看到</title>或<body>即可停止读取，
+字符集按 Content-Type 响应头 -> <meta charset> -> 常见编码回退 的顺序确定
+"""
+
+import codecs
+import re
+from html import unescape
+
+
+class TitleSniffer:
+    TITLE_OPEN = re.compile(rb'<title[^>]*>', re.IGNORECASE)
+    TITLE_CLOSE = re.compile(rb'</title\s*>', re.IGNORECASE)
+    BODY_OPEN = re.compile(rb'<body[\s>]', re.IGNORECASE)
+    META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+    HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+    # 被chunk切断的标签最多回退重扫的字节数，页面中未闭合的'<'不会导致每次都从它开始重扫
+    MAX_TAG_LENGTH = 256
+
+    # 未声明字符集时依次尝试的编码（gb18030兼容gbk/gb2312）
+    FALLBACK_ENCODINGS = ['utf-8', 'gb18030', 'big5']
+
+    def __init__(self, content_type: str = '', content_length: int = 0,
+                 max_length: int = 1024 * 1024, max_title_length: int = 50):
+        """
+        初始化标题嗅探器
+
+        Args:
+            content_type: 响应头中的Content-Type
+            content_length: 响应头中的Content-Length，用于预分配缓冲区，未知时为0
+            max_length: 最多读取的字节数
+            max_title_length: 标题最大显示长度，超出部分截断
+        """
+        self.is_html = 'text/html' in content_type.lower()
+        self.header_charset = self._normalize_charset(self._search_header_charset(content_type))
+        self.max_length = max_length
+        self.max_title_length = max_title_length
+
+        # 预分配缓冲区，长度已知时一次分配到位，否则按需倍增
+        initial_size = min(content_length, max_length) if content_length > 0 else 64 * 1024
+        self.buffer = bytearray(min(initial_size, max_length))
+        self.length = 0
+        # 下次扫描的起点：上次扫描到的末尾，或末尾处被chunk切断、尚未闭合的标签的'<'
+        self.scan_pos = 0
+        self.title_start = -1
+        self.title_end = -1
+        self.done = False
+
+    def _search_header_charset(self, content_type: str) -> str:
+        match = self.HEADER_CHARSET.search(content_type)
+        return match.group(1) if match else ''
+
+    def _normalize_charset(self, charset) -> str:
+        """
+        校验字符集名称，无法识别时返回空字符串
+        """
+        if isinstance(charset, bytes):
+            charset = charset.decode('ascii', 'ignore')
+        if not charset:
+            return ''
+        try:
+            return codecs.lookup(charset.strip()).name
+        except LookupError:
+            return ''
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        写入一段响应内容
+
+        Returns:
+            是否已经可以停止读取（已找到</title>、已进入<body>或达到读取上限）
+        """
+        if self.done or not chunk:
+            return self.done
+
+        writable = min(len(chunk), self.max_length - self.length)
+        end = self.length + writable
+        if end > len(self.buffer):
+            new_size = min(max(end, len(self.buffer) * 2), self.max_length)
+            self.buffer.extend(bytes(new_size - len(self.buffer)))
+        self.buffer[self.length:end] = chunk[:writable]
+        self.length = end
+
+        self._scan()
+        if self.length >= self.max_length:
+            self.done = True
+        return self.done
+
+    def _scan(self):
+        """
+        仅扫描新写入的内容，查找标题起止位置和<body>
+        """
+        view = memoryview(self.buffer)[:self.length]
+        start = self.scan_pos
+        try:
+            if self.title_start < 0:
+                match = self.TITLE_OPEN.search(view, start)
+                if match:
+                    self.title_start = match.end()
+                    start = self.title_start
+            if self.title_start >= 0:
+                match = self.TITLE_CLOSE.search(view, max(start, self.title_start))
+                if match:
+                    self.title_end = match.start()
+                    self.done = True
+                    return
+            elif self.BODY_OPEN.search(view, start):
+                # 已经进入<body>仍未见到<title>，认为页面没有标题
+                self.done = True
+        finally:
+            view.release()
+            # 最后一个'<'之后没有'>'时标签可能被切断，下次从该'<'重新扫描，最多回退MAX_TAG_LENGTH字节
+            tail = max(self.scan_pos, self.length - self.MAX_TAG_LENGTH)
+            last_open = self.buffer.rfind(b'<', tail, self.length)
+            if last_open >= 0 and self.buffer.find(b'>', last_open, self.length) < 0:
+                self.scan_pos = last_open
+            else:
+                self.scan_pos = self.length
+
+    def detect_charset(self) -> str:
+        """
+        确定页面字符集：优先响应头，其次<meta charset>
+        """
+        if self.header_charset:
+            return self.header_charset
+        head_end = self.title_start if self.title_start >= 0 else self.length
+        match = self.META_CHARSET.search(self.buffer, 0, max(head_end, min(self.length, 4096)))
+        if match:
+            return self._normalize_charset(match.group(1))
+        return ''
+
+    def decode(self, data: bytes) -> str:
+        charset = self.detect_charset()
+        if charset:
+            try:
+                return data.decode(charset)
+            except UnicodeDecodeError:
+                return data.decode(charset, errors='ignore')
+        for encoding in self.FALLBACK_ENCODINGS:
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        return data.decode('iso-8859-1')
+
+    def get_title(self) -> str:
+        """
+        返回清理后的页面标题
+        """
+        if not self.is_html:
+            return "非HTML内容"
+        if self.title_start < 0:
+            return "无标题"
+
+        title_end = self.title_end if self.title_end >= 0 else self.length
+        try:
+            title = self.decode(bytes(self.buffer[self.title_start:title_end]))
+            # 清理标题中的HTML实体和空白字符
+            title = re.sub(r'\s+', ' ', unescape(title)).strip()
+        except Exception:
+            return "标题提取失败"
+
+        if not title:
+            return "无标题"
+        # 截断过长的标题
+        if len(title) > self.max_title_length:
+            title = title[:self.max_title_length - 3] + "..."
+        return title
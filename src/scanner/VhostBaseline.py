@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+虚拟主机探测的基线响应
+虚拟主机模式下所有域名按解析到的IP请求，通过Host请求头和SNI区分站点，
+同一IP上的域名共用连接池中的连接；每个(IP, 端口, 协议)先用随机主机名请求一次默认站点作为基线，
+各虚拟主机的响应与基线比较，只有内容不同的才是该域名真正独有的站点
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+
+class VhostBaseline:
+    SAME = "与默认站点相同"
+
+    def __init__(self):
+        # 本次扫描的随机标记，基线请求使用的主机名不会被任何站点配置
+        self.token = uuid.uuid4().hex[:12]
+        # (IP, 端口, 协议) -> {'status_code': 状态码, 'fingerprint': 响应指纹, 'title': 标题}
+        self.baselines: Dict[Tuple[str, int, str], Dict] = {}
+        # 正在被某个探测请求的基线，其他探测等待其结果而不重复请求
+        self.pending: Dict[Tuple[str, int, str], threading.Event] = {}
+        self.same = 0
+        self.differs = 0
+        # 多进程扫描时从各分片汇总的基线数
+        self.merged_baselines = 0
+        self._lock = threading.Lock()
+
+    def canary_host(self, ip: str) -> str:
+        """
+        返回请求该IP默认站点使用的主机名
+        """
+        return f"{self.token}-{ip.replace('.', '-').replace(':', '-')}.invalid"
+
+    def lookup(self, key: Tuple[str, int, str]) -> Optional[Dict]:
+        return self.baselines.get(key)
+
+    def claim(self, key: Tuple[str, int, str]) -> bool:
+        """
+        申请请求某个基线，同一基线同时只由一个探测请求
+
+        Returns:
+            True 由调用方请求；False 已缓存或正由其他探测请求，应等待
+        """
+        with self._lock:
+            if key in self.baselines or key in self.pending:
+                return False
+            self.pending[key] = threading.Event()
+            return True
+
+    def wait(self, key: Tuple[str, int, str], timeout: float):
+        """
+        等待其他探测请求完该基线（线程引擎使用）
+        """
+        event = self.pending.get(key)
+        if event is not None:
+            event.wait(timeout)
+
+    async def wait_async(self, key: Tuple[str, int, str], timeout: float):
+        """
+        等待其他探测请求完该基线（异步引擎使用）
+        """
+        deadline = time.monotonic() + timeout
+        while key in self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    def store(self, key: Tuple[str, int, str], outcome: Tuple) -> Dict:
+        """
+        记录基线请求的结果（test_url的返回值），请求失败时状态码为0
+
+        Returns:
+            基线
+        """
+        _, status_code, _, title, _, _, extra = outcome
+        baseline = {'status_code': status_code, 'fingerprint': extra.get('fingerprint'), 'title': title}
+        with self._lock:
+            self.baselines[key] = baseline
+            event = self.pending.pop(key, None)
+        if event is not None:
+            event.set()
+        return baseline
+
+    def compare(self, baseline: Dict, status_code: int, fingerprint: str, title: str) -> str:
+        """
+        比较虚拟主机响应与默认站点基线
+
+        Returns:
+            差异描述，相同时为SAME
+        """
+        diffs = []
+        if not baseline['status_code']:
+            diffs.append("默认站点无响应")
+        elif status_code != baseline['status_code']:
+            diffs.append(f"状态码 {baseline['status_code']}->{status_code}")
+        elif fingerprint != baseline['fingerprint']:
+            diffs.append("内容不同")
+        if baseline['status_code'] and title and title != baseline['title']:
+            diffs.append(f"标题 '{baseline['title']}'->'{title}'")
+        with self._lock:
+            if diffs:
+                self.differs += 1
+            else:
+                self.same += 1
+        return ", ".join(diffs) or self.SAME
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'baselines': len(self.baselines) + self.merged_baselines,
+                'same': self.same,
+                'differs': self.differs,
+            }
+
+    def merge(self, stats: Dict):
+        """
+        汇总分片子进程的统计（各进程的基线独立请求，基线数按进程累加）
+        """
+        with self._lock:
+            self.merged_baselines += stats['baselines']
+            self.same += stats['same']
+            self.differs += stats['differs']
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 扫描器模块按 scanner.X 导入，与 src/main.py 的运行方式一致
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
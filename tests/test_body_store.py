@@ -0,0 +1,22 @@
+import gzip
+import json
+
+from scanner.BodyStore import BodyStore
+
+
+def test_known_digests_are_bounded(tmp_path):
+    store = BodyStore(str(tmp_path), max_known=10)
+    store.open()
+    for i in range(50):
+        store.put(f'http://{i}.example', 200, f'page {i}'.encode())
+    # 被淘汰的哈希按对象文件是否存在去重
+    store.put('http://again.example', 200, b'page 0')
+    store.close()
+
+    assert len(store.known) == 10
+    assert store.stats()['stored'] == 50
+    assert store.stats()['deduplicated'] == 1
+    with open(store.index_path, 'r', encoding='utf-8') as f:
+        digest = [json.loads(line) for line in f][-1]['hash']
+    with gzip.open(store.object_path(digest), 'rb') as f:
+        assert f.read() == b'page 0'
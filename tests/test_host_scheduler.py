@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from scanner.HostScheduler import HostScheduler
+
+
+def test_busy_host_units_are_deferred():
+    # 受限主机的大量单元不能挡住其他主机的单元
+    scheduler = HostScheduler(max_in_flight=1)
+    units = [('waf', i) for i in range(50)] + [('other', i) for i in range(3)]
+    dispatched = []
+    for unit, key in scheduler.dispatch(units, lambda unit: unit[0]):
+        if unit is None:
+            break
+        dispatched.append(unit)
+    assert dispatched == [('waf', 0), ('other', 0)]
+    assert scheduler.in_flight == {'waf': 1, 'other': 1}
+
+
+def test_deferred_units_keep_host_order():
+    scheduler = HostScheduler(max_in_flight=1)
+    units = [('a', i) for i in range(3)] + [('b', i) for i in range(2)]
+    dispatched = []
+    for unit, key in scheduler.dispatch(units, lambda unit: unit[0]):
+        if unit is None:
+            # 模拟在途单元全部完成
+            for busy in list(scheduler.in_flight):
+                scheduler.release(busy)
+            continue
+        dispatched.append(unit)
+    assert [unit for unit in dispatched if unit[0] == 'a'] == [('a', 0), ('a', 1), ('a', 2)]
+    assert [unit for unit in dispatched if unit[0] == 'b'] == [('b', 0), ('b', 1)]
+    assert scheduler.waits == 3
+
+
+def test_rate_limited_host_yields_wait():
+    scheduler = HostScheduler(rate=2)
+    steps = []
+    for unit, key in scheduler.dispatch([('a', 0), ('a', 1)], lambda unit: unit[0]):
+        steps.append((unit, key))
+        if unit is None:
+            time.sleep(key)
+    assert steps[0] == (('a', 0), 'a')
+    assert steps[1][0] is None and 0 < steps[1][1] <= 0.5
+    assert steps[-1] == (('a', 1), 'a')
+
+
+def test_pace_async_spaces_extra_requests():
+    scheduler = HostScheduler(rate=10)
+
+    async def run():
+        for _ in range(3):
+            await scheduler.pace_async('a')
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,42 @@
+import asyncio
+import socket
+
+from scanner.AsyncHttpEngine import AsyncHttpEngine
+from scanner.HttpScanner import HttpScanner
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def observed(scanner, phase):
+    return sum(scanner.latency.counts[phase])
+
+
+def test_thread_engine_observes_refused_connection():
+    port = closed_port()
+    scanner = HttpScanner(timeout=2, engine='thread', ports=[(port, 'http')])
+    success, status_code, _, _, _, error, _ = scanner.test_url(f"http://127.0.0.1:{port}")
+    assert not success and error == '连接失败'
+    # 连接被拒绝的请求同样计入建连和总耗时
+    assert observed(scanner, 'connect') >= 1
+    assert observed(scanner, 'total') == 1
+
+
+def test_async_engine_observes_refused_connection():
+    port = closed_port()
+    scanner = HttpScanner(timeout=2, engine='async', ports=[(port, 'http')])
+    engine = AsyncHttpEngine(scanner)
+
+    async def run():
+        async with engine.create_session() as session:
+            return await engine.test_url(session, f"http://127.0.0.1:{port}")
+
+    success, status_code, _, _, _, error, _ = asyncio.run(run())
+    assert not success and error == '连接失败'
+    assert observed(scanner, 'connect') == 1
+    assert observed(scanner, 'total') == 1
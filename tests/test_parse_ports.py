@@ -0,0 +1,27 @@
+import pytest
+
+from scanner.HttpScanner import HttpScanner
+
+
+def test_ranges_and_inferred_protocols():
+    assert HttpScanner.parse_ports('80,443,8000-8002') == [
+        (80, 'http'), (443, 'https'), (8000, 'http'), (8001, 'http'), (8002, 'http')]
+
+
+def test_explicit_protocol_applies_to_whole_range():
+    assert HttpScanner.parse_ports('8443-8444:http, 81:HTTPS') == [(8443, 'http'), (8444, 'http'), (81, 'https')]
+
+
+def test_duplicates_are_merged_and_last_protocol_wins():
+    assert HttpScanner.parse_ports('80,79-81,80,443,443:http') == [(80, 'http'), (79, 'http'), (81, 'http'),
+                                                                   (443, 'http')]
+
+
+def test_empty_items_are_ignored():
+    assert HttpScanner.parse_ports(' 80 ,, ') == [(80, 'http')]
+
+
+@pytest.mark.parametrize('spec', ['', ',', 'abc', '80-abc', '0', '65536', '90-80', '-80', '80:ftp', '1-65536'])
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        HttpScanner.parse_ports(spec)
@@ -0,0 +1,43 @@
+from scanner.PathProbe import PathProbe
+
+ORIGIN = ('example.com', 443, 'https')
+
+
+def outcome(status_code, fingerprint, success=True):
+    return success, status_code, 'https://example.com/x', '', '', '', {'fingerprint': fingerprint}
+
+
+def probe_with_baseline(status_code=200, fingerprint='soft404'):
+    probe = PathProbe(['/admin'])
+    probe.store_baseline(ORIGIN, outcome(status_code, fingerprint))
+    return probe
+
+
+def test_same_status_and_fingerprint_as_baseline_is_soft_404():
+    probe = probe_with_baseline()
+    assert not probe.is_interesting(ORIGIN, outcome(200, 'soft404'))
+    assert probe.stats() == {'requests': 2, 'hits': 0, 'dropped': 1}
+
+
+def test_different_status_is_interesting():
+    probe = probe_with_baseline()
+    assert probe.is_interesting(ORIGIN, outcome(403, 'soft404'))
+
+
+def test_different_fingerprint_is_interesting():
+    probe = probe_with_baseline()
+    assert probe.is_interesting(ORIGIN, outcome(200, 'admin-page'))
+    assert probe.stats()['hits'] == 1
+
+
+def test_failed_request_is_not_interesting():
+    probe = probe_with_baseline()
+    assert not probe.is_interesting(ORIGIN, outcome(0, None, success=False))
+    assert probe.stats()['dropped'] == 0
+
+
+def test_origin_without_baseline_is_skipped():
+    probe = probe_with_baseline()
+    probe.store_baseline(('down.example.com', 80, 'http'), outcome(0, None, success=False))
+    units = list(probe.iter_units([ORIGIN, ('down.example.com', 80, 'http')]))
+    assert units == [ORIGIN + ('/admin',)]
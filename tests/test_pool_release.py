@@ -0,0 +1,58 @@
+import http.server
+import threading
+
+import pytest
+
+from scanner.HttpClientPool import HttpClientPool
+
+
+CLIENTS = set()
+
+
+class ChunkedHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        CLIENTS.add(self.client_address)
+        size = 1024 if self.path == '/small' else 256 * 1024
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for _ in range(size // 1024):
+            self.wfile.write(b'400\r\n' + b'x' * 1024 + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def chunked_url():
+    CLIENTS.clear()
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ChunkedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch_twice(url):
+    pool = HttpClientPool({}, max_drain_bytes=64 * 1024)
+    for _ in range(2):
+        response = pool.get(url, timeout=2, stream=True)
+        # 只读取正文开头，其余交给release处理
+        next(pool.iter_body(response))
+        pool.release(response)
+    pool.close()
+    # 服务端看到的客户端连接数
+    return len(CLIENTS)
+
+
+def test_small_chunked_response_reuses_connection(chunked_url):
+    assert fetch_twice(chunked_url + '/small') == 1
+
+
+def test_large_chunked_response_closes_connection(chunked_url):
+    assert fetch_twice(chunked_url + '/large') == 2
@@ -0,0 +1,60 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from scanner.AsyncHttpEngine import AsyncHttpEngine
+from scanner.HttpScanner import HttpScanner
+
+
+@pytest.fixture
+def handshake_tarpit():
+    """接受TCP连接但从不回应TLS ClientHello"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    accepted = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield server.getsockname()[1]
+    server.close()
+    for conn in accepted:
+        conn.close()
+
+
+def test_thread_engine_aborts_tarpitted_tls_handshake(handshake_tarpit):
+    scanner = HttpScanner(timeout=8, engine='thread', probe_deadline=1, ports=[(handshake_tarpit, 'https')])
+    start = time.monotonic()
+    success, status_code, _, _, _, error, _ = scanner.test_url(f"https://127.0.0.1:{handshake_tarpit}")
+    assert time.monotonic() - start < 4
+    assert not success and status_code == 0
+    assert error == '超过截止时间'
+    # 探测结束后不再保留该线程的活动连接
+    assert not scanner.pool._active_connections
+
+
+def test_async_vhost_baseline_respects_probe_deadline(handshake_tarpit):
+    scanner = HttpScanner(timeout=8, engine='async', probe_deadline=1, vhost=True,
+                          ports=[(handshake_tarpit, 'https')])
+    scanner.domain_ips = {'www.example.com': ['127.0.0.1']}
+    engine = AsyncHttpEngine(scanner)
+
+    async def run():
+        async with engine.create_session() as session:
+            return await engine.fetch_vhost_baseline(session, ('127.0.0.1', handshake_tarpit, 'https'))
+
+    start = time.monotonic()
+    baseline = asyncio.run(run())
+    # 默认站点基线请求同样受截止时间限制
+    assert time.monotonic() - start < 4
+    assert baseline['status_code'] == 0
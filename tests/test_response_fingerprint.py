@@ -0,0 +1,71 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from scanner.HttpScanner import HttpScanner
+from scanner.ResponseFingerprint import FingerprintIndex
+
+
+def test_small_clusters_are_bounded():
+    index = FingerprintIndex(cluster_threshold=3, max_small_clusters=100)
+    for i in range(1000):
+        index.add(f'fp{i}', f'http://{i}.example')
+    assert len(index.small_clusters) == 100
+    assert not index.clusters
+
+
+def test_cluster_promoted_at_threshold():
+    index = FingerprintIndex(cluster_threshold=3, max_small_clusters=10)
+    displays = []
+    for i in range(6):
+        index.add('parked', f'http://{i}.example')
+        displays.append(index.claim_display('parked'))
+        # 大量只出现一次的指纹不会把正在增长的簇挤出去
+        index.add(f'once{i}', f'http://once{i}.example')
+    assert displays == [1, 1, 1, 0, -1, -1]
+    assert index.is_collapsed('parked')
+    assert index.top_clusters() == [('parked', {'count': 6, 'url': 'http://2.example', 'shown': 6})]
+
+
+class WelcomeHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        # 同一模板，标题中回显请求的Host，标题之前有超过指纹前缀长度的内容
+        body = ('<html><head><script>' + ' ' * 5000 + '</script>'
+                f'<title>Welcome to {self.headers["Host"]}</title></head></html>').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_port():
+    server = http.server.ThreadingHTTPServer(('0.0.0.0', 0), WelcomeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('engine', ['async', 'thread'])
+def test_same_template_keeps_each_hosts_title(tmp_path, http_port, engine):
+    hosts = ['127.0.0.1', '127.0.0.2', 'localhost']
+    input_file = tmp_path / 'domains.txt'
+    input_file.write_text('\n'.join(hosts) + '\n', encoding='utf-8')
+    results_file = tmp_path / 'results.jsonl'
+
+    scanner = HttpScanner(timeout=2, max_workers=1, engine=engine, ports=[(http_port, 'http')],
+                          journal_file=str(tmp_path / 'scan.journal'))
+    scanner.scan_from_file(str(input_file), str(results_file))
+
+    with open(results_file, 'r', encoding='utf-8') as f:
+        results = [json.loads(line) for line in f]
+    assert len({result['fingerprint'] for result in results}) == 1
+    assert {result['title'] for result in results} == {f'Welcome to {host}:{http_port}' for host in hosts}
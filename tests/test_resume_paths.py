@@ -0,0 +1,66 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from scanner.HttpScanner import HttpScanner
+
+REQUESTS = []
+
+
+class PathHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        REQUESTS.append((self.headers['Host'].partition(':')[0], self.path))
+        if self.path in ('/', '/admin', '/secret'):
+            body = f'<html><title>{self.path}</title></html>'.encode()
+            self.send_response(200)
+        else:
+            body = b'not found'
+            self.send_response(404)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_port():
+    REQUESTS.clear()
+    server = http.server.ThreadingHTTPServer(('0.0.0.0', 0), PathHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('engine', ['async', 'thread'])
+def test_resume_finishes_path_probe_of_journaled_origin(tmp_path, http_port, engine):
+    wordlist = tmp_path / 'paths.txt'
+    wordlist.write_text('admin\nsecret\n', encoding='utf-8')
+    input_file = tmp_path / 'domains.txt'
+    input_file.write_text('127.0.0.1\n127.0.0.2\n', encoding='utf-8')
+    journal_file = tmp_path / 'scan.journal'
+    # 上次扫描完成了第一个源站的根路径探测和/admin，敏感路径探测被中断
+    admin_hit = {'domain': '127.0.0.1', 'url': f'http://127.0.0.1:{http_port}/admin', 'status_code': 200,
+                 'title': '/admin', 'path': '/admin'}
+    journal_file.write_text(
+        json.dumps({'domain': '127.0.0.1', 'port': http_port, 'result': None, 'origin': 'http'}) + '\n' +
+        json.dumps({'domain': '127.0.0.1', 'port': http_port, 'result': admin_hit}) + '\n',
+        encoding='utf-8')
+
+    scanner = HttpScanner(timeout=2, max_workers=4, engine=engine, batch_size=1, path_wordlist=str(wordlist),
+                          journal_file=str(journal_file), resume=True, ports=[(http_port, 'http')])
+    scanner.scan_from_file(str(input_file), str(tmp_path / 'results.jsonl'))
+
+    first = [path for host, path in REQUESTS if host == '127.0.0.1']
+    assert '/' not in first and '/admin' not in first and '/secret' in first
+    second = [path for host, path in REQUESTS if host == '127.0.0.2']
+    assert {'/', '/admin', '/secret'} <= set(second)
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        done = {json.loads(line)['domain'] for line in f if 'paths_done' in line}
+    assert done == {'127.0.0.1', '127.0.0.2'}
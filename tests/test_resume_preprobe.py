@@ -0,0 +1,51 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from scanner.HttpScanner import HttpScanner
+
+DOMAINS = ['127.0.0.1', '127.0.0.2', '127.0.0.3', '127.0.0.4']
+
+
+class TitleHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'<html><title>ok</title></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_port():
+    server = http.server.ThreadingHTTPServer(('0.0.0.0', 0), TitleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('engine', ['async', 'thread'])
+def test_resume_with_preprobe_scans_every_batch(tmp_path, http_port, engine):
+    input_file = tmp_path / 'domains.txt'
+    input_file.write_text('\n'.join(DOMAINS) + '\n', encoding='utf-8')
+    journal_file = tmp_path / 'scan.journal'
+    # 上次扫描已完成第一个域名
+    journal_file.write_text(json.dumps({'domain': DOMAINS[0], 'port': http_port, 'result': None}) + '\n',
+                            encoding='utf-8')
+
+    scanner = HttpScanner(timeout=2, max_workers=4, engine=engine, preprobe=True, batch_size=1,
+                          journal_file=str(journal_file), resume=True, ports=[(http_port, 'http')])
+    hit_counts = scanner.scan_from_file(str(input_file), str(tmp_path / 'results.jsonl'))
+
+    assert hit_counts == {200: len(DOMAINS) - 1}
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        done = {json.loads(line)['domain'] for line in f}
+    assert done == set(DOMAINS)
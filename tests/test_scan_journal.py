@@ -0,0 +1,19 @@
+from scanner.ScanJournal import ScanJournal
+
+
+def test_completed_only_loaded_on_resume(tmp_path):
+    path = str(tmp_path / 'scan.journal')
+    journal = ScanJournal(path)
+    journal.record('a.com', 80, {'url': 'http://a.com'})
+    journal.record_skipped('b.com', [80, 443])
+    journal.close()
+    # 本次扫描完成的探测不常驻内存
+    assert not journal.completed
+
+    resumed = ScanJournal(path, resume=True)
+    resumed.record_skipped('b.com', [80, 443])
+    resumed.close()
+    assert resumed.completed == {('a.com', 80), ('b.com', 80), ('b.com', 443)}
+    assert resumed.results == [{'url': 'http://a.com'}]
+    with open(path, 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
@@ -0,0 +1,32 @@
+import json
+
+from scanner.TechFingerprint import PatternSet, TechMatcher
+
+
+def test_overlapping_regex_signatures_all_reported():
+    patterns = PatternSet()
+    # 两条规则从同一位置开始匹配，第三条与前两条重叠
+    patterns.add('Jenkins', r're:x-jenkins:\s*([\d.]+)')
+    patterns.add('JenkinsAny', r're:x-jenkins')
+    patterns.add('Hudson', r're:jenkins:\s*[\d.]+\s*hudson')
+    patterns.compile()
+    assert patterns.scan('X-Jenkins: 2.401 hudson') == {'Jenkins': '2.401', 'JenkinsAny': '', 'Hudson': ''}
+
+
+def test_version_taken_from_any_match():
+    patterns = PatternSet()
+    patterns.add('jQuery', r're:jquery(?:-([\d.]+))?\.js')
+    patterns.compile()
+    assert patterns.scan('<script src="jquery.js"></script><script src="jquery-3.6.0.js">') == {'jQuery': '3.6.0'}
+    assert patterns.scan('<html></html>') == {}
+
+
+def test_matcher_reports_overlapping_body_signatures(tmp_path):
+    signatures = tmp_path / 'signatures.json'
+    signatures.write_text(json.dumps({
+        'WordPress': {'body': ['re:/wp-content/themes/([\\w-]+)']},
+        'WordPressCore': {'body': ['re:/wp-content/']},
+    }), encoding='utf-8')
+    matcher = TechMatcher([str(signatures)])
+    body = b'<link href="/wp-content/themes/astra/style.css">'
+    assert matcher.match({}, '', body) == 'WordPress/astra, WordPressCore'
@@ -0,0 +1,40 @@
+from scanner.TitleSniffer import TitleSniffer
+
+PAGE = b'<html><head><title data-react-helmet="true">Hello World</title></head><body>x</body></html>'
+
+
+def test_title_open_tag_split_across_chunks():
+    # 在<title ...>开始标签内部任意位置切断
+    title_pos = PAGE.index(b'<title')
+    for split in range(title_pos, PAGE.index(b'Hello')):
+        sniffer = TitleSniffer('text/html')
+        sniffer.feed(PAGE[:split])
+        sniffer.feed(PAGE[split:])
+        assert sniffer.get_title() == 'Hello World'
+
+
+def test_title_fed_byte_by_byte():
+    sniffer = TitleSniffer('text/html')
+    for i in range(len(PAGE)):
+        if sniffer.feed(PAGE[i:i + 1]):
+            break
+    assert sniffer.get_title() == 'Hello World'
+
+
+def test_unterminated_tag_does_not_rescan_whole_body():
+    # 开头有一个永远不闭合的'<'，之后是大量小块正文
+    sniffer = TitleSniffer('text/html')
+    sniffer.feed(b'<html><head><')
+    chunk = b'a' * 512
+    while not sniffer.feed(chunk):
+        # 每次只回退重扫末尾的一小段
+        assert sniffer.length - sniffer.scan_pos <= TitleSniffer.MAX_TAG_LENGTH
+    assert sniffer.length == sniffer.max_length
+    assert sniffer.get_title() == '无标题'
+
+
+def test_title_after_stray_open_bracket():
+    sniffer = TitleSniffer('text/html')
+    for chunk in (b'<html><head><', b'x' * 4096, b'<tit', b'le>Hello</title>'):
+        sniffer.feed(chunk)
+    assert sniffer.get_title() == 'Hello'